@@ -0,0 +1,60 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from . import cache
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    `JWTAuthentication` building the user from the token's user id and a short lived cache of its
+    authentication fields, instead of loading the user row on every request.
+
+    The user only holds ``cache.CACHED_FIELDS``, its other fields and its profile are loaded on first access.
+    """
+
+    def get_user(self, validated_token):
+        return self.build_user(validated_token, cache.get_entry(self.get_user_id(validated_token)))
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+    def build_user(self, validated_token, entry):
+        # same checks as `JWTAuthentication.get_user`
+        if entry is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if not entry['is_active']:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != entry['password_hash']:
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return cache.from_entry(entry)
+
+
+class AsyncJWTAuthentication(CachedJWTAuthentication):
+    """
+    `CachedJWTAuthentication` for native async views, a cache miss is loaded with the async ORM.
+    """
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        return self.build_user(validated_token, await cache.aget_entry(self.get_user_id(validated_token)))
@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+User = get_user_model()
+
+# enough for authentication and permission checks, any other field is loaded on first access
+CACHED_FIELDS = ('id', 'email', 'username', 'first_name', 'last_name', 'is_active', 'is_staff', 'is_superuser')
+
+
+def user_key(user_id):
+    return f"auth-user:{user_id}"
+
+
+def to_entry(values):
+    entry = {field: values[field] for field in CACHED_FIELDS}
+    # tokens are revoked on password change by comparing this hash, the password itself is never cached
+    entry['password_hash'] = get_md5_hash_password(values['password'])
+    return entry
+
+
+def from_entry(entry):
+    """
+    A `User` holding the cached fields only, the others are deferred and its profile is loaded on access.
+    """
+    return User.from_db(router.db_for_read(User), CACHED_FIELDS, [entry[field] for field in CACHED_FIELDS])
+
+
+def get_entry(user_id):
+    """
+    Return the cached authentication fields of a user, loading them on a miss, ``None`` when there is no such user.
+    """
+    key = user_key(user_id)
+    entry = cache.get(key)
+    if entry is None:
+        values = User.objects.filter(id=user_id).values(*CACHED_FIELDS, 'password').first()
+        if values is None:
+            return None
+        entry = to_entry(values)
+        # `add` never overwrites the fresher entry of a concurrent request
+        cache.add(key, entry, settings.USER_CACHE_TIMEOUT)
+
+    return entry
+
+
+async def aget_entry(user_id):
+    # async counterpart of `get_entry`, for the native async views
+    key = user_key(user_id)
+    entry = await cache.aget(key)
+    if entry is None:
+        values = await User.objects.filter(id=user_id).values(*CACHED_FIELDS, 'password').afirst()
+        if values is None:
+            return None
+        entry = to_entry(values)
+        await cache.aadd(key, entry, settings.USER_CACHE_TIMEOUT)
+
+    return entry
+
+
+def invalidate(user_id):
+    cache.delete(user_key(user_id))
@@ -0,0 +1,58 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.authentication import CachedJWTAuthentication
+from accounts.cache import user_key
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Compare the queries and time spent authenticating JWT requests with and without the user cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--users', type=int, default=100, help="distinct users the requests are spread over")
+
+    def handle(self, *args, **options):
+        user_ids = list(User.objects.filter(is_active=True).order_by('id').values_list('id', flat=True)[
+                        :options['users']])
+        if not user_ids:
+            raise CommandError("no active users, see the generate_dataset command")
+
+        factory = RequestFactory()
+        requests = [
+            factory.get('/', HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(User(id=user_ids[i % len(user_ids)]))}")
+            for i in range(options['requests'])
+        ]
+
+        self.stdout.write(f"{len(requests)} requests over {len(user_ids)} users")
+        results = {}
+        for authentication in (JWTAuthentication(), CachedJWTAuthentication()):
+            # every user starts uncached, so the misses are part of the numbers
+            cache.delete_many([user_key(user_id) for user_id in user_ids])
+
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                for request in requests:
+                    user, _ = authentication.authenticate(request)
+                    # what most views use
+                    user.id
+                elapsed = time.perf_counter() - started
+
+            name = type(authentication).__name__
+            results[name] = len(queries) / len(requests)
+            self.stdout.write(
+                f"{name:<25}{results[name]:>6.3f} queries/request {elapsed / len(requests) * 1e6:>8.0f}us/request"
+            )
+
+        saved = results['JWTAuthentication'] - results['CachedJWTAuthentication']
+        self.stdout.write(f"saved {saved:.3f} queries per request")
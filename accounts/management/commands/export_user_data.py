@@ -0,0 +1,35 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import User
+from social_network.export import export_user, parse_cursor
+
+
+class Command(BaseCommand):
+    help = "Stream everything a user owns as NDJSON, optionally resuming after an export cursor."
+
+    def add_arguments(self, parser):
+        parser.add_argument('email')
+        parser.add_argument('--cursor', help="resume right after the line carrying this cursor")
+        parser.add_argument('--output', help="file to write to, stdout by default")
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(email=options['email']).first()
+        if user is None:
+            raise CommandError(f"no user with email '{options['email']}'")
+
+        if options['cursor']:
+            try:
+                parse_cursor(user, options['cursor'])
+            except ValueError as error:
+                raise CommandError(f"invalid cursor: {error}")
+
+        # appending lets an interrupted export be resumed into the same file
+        output = open(options['output'], 'a') if options['output'] else sys.stdout
+        try:
+            for line in export_user(user, options['cursor']):
+                output.write(line)
+        finally:
+            if output is not sys.stdout:
+                output.close()
@@ -0,0 +1,22 @@
+from functools import partial
+
+from django.db import transaction
+from django.dispatch import receiver
+from django.db.models.signals import post_save, post_delete
+from django.contrib.auth import get_user_model
+
+from . import cache
+
+User = get_user_model()
+
+
+@receiver(signal=post_save, sender=User)
+def invalidate_cached_user(sender, instance, created, **kwargs):
+    # covers deactivation and password changes, the next request reloads the user
+    if not created:
+        transaction.on_commit(partial(cache.invalidate, instance.pk))
+
+
+@receiver(signal=post_delete, sender=User)
+def invalidate_deleted_user(sender, instance, **kwargs):
+    transaction.on_commit(partial(cache.invalidate, instance.pk))
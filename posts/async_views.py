@@ -0,0 +1,34 @@
+from social_network.async_views import AsyncAPIView
+from .serializers import PostSerializer, ListCommentSerializer, ListLikeSerializer
+from .models import Post, Comment, Like, PinnedPost, PinnedComment
+
+
+class AsyncListPostAPIView(AsyncAPIView):
+    async def get(self, request, id):
+        queryset = Post.objects.list_with_pin_filter(PinnedPost).filter(
+            Post.objects.visibility(request.user), author_id=id)
+        return await self.paginated_response(queryset, PostSerializer)
+
+
+class AsyncCommentAPIView(AsyncAPIView):
+    async def get(self, request, id):
+        queryset = Comment.objects.list_with_pin_filter(PinnedComment).filter(
+            Comment.objects.visibility(request.user), post_id=id)
+        return await self.paginated_response(queryset, ListCommentSerializer)
+
+
+class AsyncReplyAPIView(AsyncAPIView):
+    async def get(self, request, id):
+        queryset = Comment.objects.list_with_pin_filter(PinnedComment).filter(
+            Comment.objects.visibility(request.user), parent_id=id)
+        return await self.paginated_response(queryset, ListCommentSerializer)
+
+
+class AsyncLikeAPIView(AsyncAPIView):
+    async def get(self, request, id, target_type):
+        # `ContentType.objects.get_for_model` may query synchronously, join on the natural key instead
+        opts = target_type._meta
+        queryset = Like.objects.filter(content_type__app_label=opts.app_label, content_type__model=opts.model_name,
+                                       object_id=id, is_liked=True).filter(
+            Like.objects.visibility(target_type, id, request.user))
+        return await self.paginated_response(queryset, ListLikeSerializer)
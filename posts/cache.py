@@ -0,0 +1,63 @@
+import time
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+
+from profiles.cache import get_states
+from profiles.models import Relation
+
+
+def listing_version_key(author_id):
+    return f"post-list-version:{author_id}"
+
+
+def get_listing_version(author_id):
+    key = listing_version_key(author_id)
+    version = cache.get(key)
+    if version is None:
+        # starts from the clock, so a version key that was evicted never comes back to an already used version
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_listing(author_id):
+    """
+    Drop every cached page of `author_id`'s posts at once by moving their version forward, old entries just expire.
+    """
+    try:
+        cache.incr(listing_version_key(author_id))
+    except ValueError:
+        cache.add(listing_version_key(author_id), time.time_ns(), None)
+
+
+def visibility_class(viewer_id, author_id):
+    if viewer_id == author_id:
+        return 'author'
+
+    states = get_states([(viewer_id, author_id), (author_id, viewer_id)])
+    if Relation.RelationChoices.BLOCKS in states.values():
+        return 'blocked'
+    if states[(viewer_id, author_id)] == Relation.RelationChoices.FOLLOWS:
+        return 'follower'
+    return 'other'
+
+
+def listing_key(author_id, viewer_id, url):
+    """
+    Cache key of one page of `author_id`'s posts, as listed for `viewer_id` at `url` (which holds the cursor).
+
+    The version is read before the page is built, a write committing in between moves it and so never gets
+    its stale page cached under the new version.
+    """
+    digest = md5(url.encode(), usedforsecurity=False).hexdigest()
+    return f"post-list:{author_id}:{get_listing_version(author_id)}:{visibility_class(viewer_id, author_id)}:{digest}"
+
+
+def get_listing(key):
+    return cache.get(key)
+
+
+def set_listing(key, data):
+    cache.set(key, data, settings.POST_LIST_CACHE_TIMEOUT)
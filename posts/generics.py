@@ -1,4 +1,4 @@
-from django.shortcuts import get_object_or_404
+from django.http import Http404
 from rest_framework.views import APIView
 from rest_framework import serializers
 from rest_framework.status import HTTP_200_OK
@@ -9,49 +9,29 @@ from .permissions import IsAuthor
 
 class PinnedItemAPIView(APIView):
     limit = None
-    queryset = None
     object_model = None
     pinned_object_model = None
     permission_classes = (IsAuthor,)
 
-    def get_queryset(self):
-        return self.queryset.all()
-
     def get_limit(self):
         return self.limit
 
-    def get_pinned_count(self):
-        queryset = self.get_queryset()
-        return queryset.filter(user=self.request.user).count()
+    def perform_toggle(self, object_id):
+        return self.pinned_object_model.objects.toggle(self.object_model, object_id, self.request.user,
+                                                       self.get_limit())
 
     def post(self, request, *args, **kwargs):
-        pinned_count = self.get_pinned_count()
-
-        if pinned_count >= self.get_limit():
-            raise serializers.ValidationError("pin limit has been exceeded")
-
-        obj = get_object_or_404(self.object_model, pk=self.kwargs.get('id'))
-        self.check_object_permissions(request, obj)
+        object_id = self.kwargs.get('id')
+        toggled = self.perform_toggle(object_id)
+        if toggled is None:
+            raise Http404
 
-        lookup_fields = {
-            "user": request.user,
-            f"{self.object_model.__name__}_id".lower(): obj.id
-        }
+        author_id, is_active, was_active = toggled
+        # nothing was written unless `IsAuthor` passes on the same author
+        self.check_object_permissions(request, self.object_model(pk=object_id, author_id=author_id))
 
-        pinned_obj = self.pinned_object_model.objects.filter(**lookup_fields).first()
-
-        if pinned_obj:
-            pinned_obj.is_active = not pinned_obj.is_active
-            pinned_obj.save(update_fields=['is_active'])
-            message = "pinned" if pinned_obj.is_active else "unpinned"
-
-        else:
-            lookup_fields = {
-                "user": request.user,
-                f"{self.object_model.__name__}_id".lower(): self.kwargs.get('id')
-            }
-
-            self.pinned_object_model.objects.create(**lookup_fields)
-            message = "pinned"
+        if not is_active and not was_active:
+            raise serializers.ValidationError("pin limit has been exceeded")
 
+        message = "pinned" if is_active else "unpinned"
         return Response(f"{self.object_model.__name__} {message}", status=HTTP_200_OK)
@@ -0,0 +1,85 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+
+from social_network.conditional import bump_version
+from .cache import invalidate_listing
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.IMAGE_PIPELINE_WORKERS,
+                                       thread_name_prefix='image-pipeline')
+    return _executor
+
+
+def render_variants(file):
+    """
+    Resize and re-encode an image file into every variant of ``IMAGE_VARIANTS``.
+
+    :param file: a readable binary file holding the original image
+    :return: a list of (name, encoded bytes, width, height) tuples
+    """
+    sizes = sorted(settings.IMAGE_VARIANTS.items(), key=lambda item: item[1], reverse=True)
+
+    with Image.open(file) as original:
+        # lets JPEG decode at a reduced scale when the largest variant is much smaller than the upload
+        original.draft('RGB', (sizes[0][1], sizes[0][1]))
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+        variants = []
+        # each variant is shrunk from the previous, larger one instead of from the full upload
+        for name, size in sizes:
+            # never upscales, only shrinks to fit a size x size box keeping the aspect ratio
+            image.thumbnail((size, size), Image.Resampling.LANCZOS)
+
+            buffer = BytesIO()
+            image.save(buffer, format=settings.IMAGE_VARIANT_FORMAT, quality=settings.IMAGE_VARIANT_QUALITY)
+            variants.append((name, buffer.getvalue(), image.width, image.height))
+
+        return variants
+
+
+def generate_variants(post_id):
+    try:
+        post = Post.objects.only('id', 'author_id', 'image').get(pk=post_id)
+        if not post.image:
+            return
+
+        with post.image.open('rb') as file:
+            rendered = render_variants(file)
+
+        extension = settings.IMAGE_VARIANT_FORMAT.lower()
+        variants = {}
+        for name, content, width, height in rendered:
+            path = default_storage.save(f"variants/{post.id}/{name}.{extension}", ContentFile(content))
+            variants[name] = {"url": default_storage.url(path), "width": width, "height": height}
+
+        bump_version(Post.objects.filter(pk=post_id), image_variants=variants)
+        if post.author_id is not None:
+            invalidate_listing(post.author_id)
+    except Exception:
+        logger.exception("generating image variants of post %s failed", post_id)
+    finally:
+        # worker threads outlive requests, so the request cycle never closes their connections
+        connections.close_all()
+
+
+def schedule_variants(post):
+    if post.image:
+        transaction.on_commit(lambda: get_executor().submit(generate_variants, post.pk))
@@ -0,0 +1,89 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncClient, Client, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from posts.models import Post, Comment
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Compare the sync (WSGI) and native async (ASGI) read endpoints under concurrent load."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, required=True, help="id of the user whose posts are read")
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=16)
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(pk=options['user']).first()
+        if user is None:
+            raise CommandError(f"user {options['user']} does not exist")
+
+        post = Post.objects.filter(author=user).order_by('-like_count').first()
+        comment = Comment.objects.filter(post=post, parent__isnull=True).order_by('-reply_count').first()
+        if comment is None:
+            raise CommandError("the user needs a post with comments")
+
+        paths = [
+            f"profiles/{user.id}/posts/",
+            f"posts/{post.id}/comments/",
+            f"comments/{comment.id}/replies/",
+            f"posts/{post.id}/likes/",
+            f"profile/{user.id}/",
+        ]
+        headers = {'Authorization': f"Bearer {AccessToken.for_user(user)}"}
+
+        # the test clients send 'testserver' as host, as under the test runner
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for path in paths:
+                sync = self.run_sync(f"/{path}", headers, options['requests'], options['concurrency'])
+                native = asyncio.run(
+                    self.run_async(f"/async/{path}", headers, options['requests'], options['concurrency']))
+                self.stdout.write(path)
+                self.report('wsgi', *sync)
+                self.report('asgi', *native)
+
+    def run_sync(self, path, headers, requests, concurrency):
+        def call(_):
+            started = time.perf_counter()
+            response = Client().get(path, headers=headers)
+            latency = time.perf_counter() - started
+            connections.close_all()
+            return response.status_code, latency
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            started = time.perf_counter()
+            results = list(executor.map(call, range(requests)))
+            return results, time.perf_counter() - started
+
+    async def run_async(self, path, headers, requests, concurrency):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def call():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(path, headers=headers)
+                return response.status_code, time.perf_counter() - started
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(call() for _ in range(requests)))
+        return results, time.perf_counter() - started
+
+    def report(self, name, results, elapsed):
+        failed = sum(status != 200 for status, _ in results)
+        latencies = [latency * 1000 for _, latency in results]
+        percentiles = statistics.quantiles(latencies, n=100)
+        self.stdout.write(
+            f"  {name}: {len(results) / elapsed:.0f} req/s, p50 {percentiles[49]:.1f}ms, "
+            f"p99 {percentiles[98]:.1f}ms, {failed} failed"
+        )
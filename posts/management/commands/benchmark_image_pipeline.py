@@ -0,0 +1,42 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from posts.images import render_variants
+
+
+class Command(BaseCommand):
+    help = "Measure the throughput of the post image variant pipeline on synthetic uploads."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--images', type=int, default=100)
+        parser.add_argument('--workers', type=int, default=settings.IMAGE_PIPELINE_WORKERS)
+        parser.add_argument('--width', type=int, default=3000)
+        parser.add_argument('--height', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        original = self.make_upload(options['width'], options['height'])
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            started = time.perf_counter()
+            rendered = list(executor.map(lambda _: render_variants(BytesIO(original)), range(options['images'])))
+            elapsed = time.perf_counter() - started
+
+        variant_bytes = sum(len(content) for variants in rendered for _, content, _, _ in variants)
+        self.stdout.write(
+            f"{options['images']} uploads of {options['width']}x{options['height']} "
+            f"({len(original) / 1024:.0f} KiB) with {options['workers']} workers: "
+            f"{elapsed:.2f}s, {options['images'] / elapsed:.1f} images/s, "
+            f"{variant_bytes / len(rendered) / 1024:.0f} KiB of variants per image"
+        )
+
+    def make_upload(self, width, height):
+        # noise compresses poorly, close to the worst case of a real photo
+        image = Image.merge('RGB', [Image.effect_noise((width, height), sigma) for sigma in (40, 60, 80)])
+        buffer = BytesIO()
+        image.save(buffer, format='JPEG', quality=90)
+        return buffer.getvalue()
@@ -0,0 +1,80 @@
+import statistics
+import time
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.ranking import FEATURES, load_candidates, score
+from profiles.models import Profile
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Measure the latency of the ranked feed per candidate set size: the scoring pass alone on synthetic " \
+           "features, then loading and scoring the candidates of real users."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,2000,5000,10000', help="comma separated candidate set sizes")
+        parser.add_argument('--users', type=int, default=20, help="users with the most followings to rank for")
+        parser.add_argument('--window-hours', type=int, default=settings.FEED_RANKING_WINDOW_HOURS,
+                            help="age of the oldest candidates, widen it for datasets spread over a longer past")
+        parser.add_argument('--repeat', type=int, default=200, help="runs of the scoring pass per size")
+        parser.add_argument('--seed', type=int)
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',')]
+        except ValueError:
+            raise CommandError(f"invalid --sizes '{options['sizes']}'")
+
+        rng = np.random.default_rng(options['seed'])
+        self.stdout.write(f"{'scoring':<10}{'size':>8}{'p50':>11}{'p95':>11}")
+        for size in sizes:
+            features = self.make_features(rng, size)
+            self.stdout.write(self.line('', size, self.measure(lambda: score(features), options['repeat'])))
+
+        users = list(Profile.objects.order_by('-following_count').values_list('user', flat=True)[:options['users']])
+        if not users:
+            raise CommandError("no users to rank for, see the generate_dataset command")
+
+        self.stdout.write(f"{'stage':<10}{'size':>8}{'p50':>11}{'p95':>11}{'candidates':>12}")
+        for size in sizes:
+            loads, scores, found = [], [], []
+            for user_id in users:
+                started = time.perf_counter()
+                candidates = load_candidates(User(id=user_id), limit=size, window_hours=options['window_hours'])
+                loaded = time.perf_counter()
+                score(candidates.features)
+                loads.append(loaded - started)
+                scores.append(time.perf_counter() - loaded)
+                found.append(len(candidates))
+
+            mean = f"{statistics.mean(found):>12.0f}"
+            self.stdout.write(self.line('load', size, loads) + mean)
+            self.stdout.write(self.line('score', size, scores) + mean)
+
+    def make_features(self, rng, size):
+        # ages within three days, engagement counts skewed like real ones
+        features = np.empty((size, len(FEATURES)))
+        features[:, 0] = rng.uniform(0, 72, size)
+        features[:, 1:] = rng.zipf(2.0, (size, len(FEATURES) - 1)) - 1
+        return features
+
+    def measure(self, function, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - started)
+        return timings
+
+    def line(self, stage, size, timings):
+        if len(timings) > 1:
+            percentiles = statistics.quantiles(timings, n=100)
+            p50, p95 = percentiles[49] * 1000, percentiles[94] * 1000
+        else:
+            p50 = p95 = sum(timings) * 1000
+        return f"{stage:<10}{size:>8}{p50:>9.3f}ms{p95:>9.3f}ms"
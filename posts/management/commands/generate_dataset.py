@@ -0,0 +1,287 @@
+import random
+import time
+from collections import Counter
+from datetime import timedelta
+from itertools import accumulate, chain
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+from psycopg import sql
+
+from posts.models import Post, Comment, Like, PinnedPost, PinnedComment, FeedItem
+from profiles.models import Profile, Relation
+from social_network.batching import copy_rows
+
+User = get_user_model()
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore et dolore "
+    "magna aliqua enim ad minim veniam quis nostrud exercitation ullamco laboris nisi aliquip ex ea commodo"
+).split()
+
+MAX_COMMENT_DEPTH = 3
+
+
+class IdAllocator:
+    """
+    Hands out ids from the table's own sequence in blocks, so rows are complete before they are copied.
+    """
+
+    def __init__(self, cursor, model, block_size):
+        self.cursor = cursor
+        self.table = model._meta.db_table
+        self.block_size = block_size
+        self.ids = []
+
+    def __call__(self):
+        if not self.ids:
+            self.cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+                [self.table, self.block_size]
+            )
+            self.ids = [row[0] for row in reversed(self.cursor.fetchall())]
+        return self.ids.pop()
+
+
+class Command(BaseCommand):
+    help = "Generate a synthetic dataset: users, profiles, a power-law follow graph, posts, comment threads, " \
+           "likes and pins, written with COPY in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--follows', type=float, default=20, help="mean followings per user")
+        parser.add_argument('--posts', type=float, default=5, help="mean posts per user")
+        parser.add_argument('--comments', type=float, default=3, help="mean top level comments per post")
+        parser.add_argument('--replies', type=float, default=1, help="mean replies per top level comment")
+        parser.add_argument('--likes', type=float, default=10, help="mean likes per post")
+        parser.add_argument('--alpha', type=float, default=1.0,
+                            help="exponent of the power law picking followed and liking users")
+        parser.add_argument('--private', type=float, default=0.1, help="share of private profiles")
+        parser.add_argument('--pins', type=float, default=0.2, help="share of users pinning posts and comments")
+        parser.add_argument('--days', type=int, default=90, help="content is spread over this many past days")
+        parser.add_argument('--feeds', action='store_true', help="also materialize the home timelines")
+        parser.add_argument('--chunk-size', type=int, default=5000, help="users generated per chunk")
+        parser.add_argument('--password', default='password', help="password of every generated user")
+        parser.add_argument('--seed', type=int)
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.random = random.Random(options['seed'])
+        self.now = timezone.now()
+        self.post_type = ContentType.objects.get_for_model(Post).id
+        self.comment_type = ContentType.objects.get_for_model(Comment).id
+        self.follower_counts = Counter()
+        self.pinned_comments = Counter()
+
+        started = time.perf_counter()
+        with connection.cursor() as cursor:
+            self.cursor = cursor
+            self.next_id = {
+                model: IdAllocator(cursor, model, options['chunk_size'])
+                for model in (User, Post, Comment)
+            }
+
+            user_ids, private_ids = self.generate_users()
+            self.log(f"{len(user_ids)} users and profiles", started)
+
+            # the most popular users get followed and like the most, rank r is picked with weight 1 / r^alpha
+            self.popular = user_ids[:]
+            self.random.shuffle(self.popular)
+            self.popularity = list(accumulate(1 / rank ** options['alpha'] for rank in range(1, len(user_ids) + 1)))
+
+            counts = Counter()
+            for start in range(0, len(user_ids), options['chunk_size']):
+                chunk = user_ids[start:start + options['chunk_size']]
+                counts.update(self.generate_relations(chunk, private_ids))
+                counts.update(self.generate_content(chunk))
+                self.log(f"{start + len(chunk)} users with content, {dict(counts)}", started)
+
+            for start in range(0, len(user_ids), options['chunk_size']):
+                Profile.objects.reconcile_counts(user_ids[start:start + options['chunk_size']])
+            self.log("profile counts", started)
+
+            if options['feeds']:
+                self.generate_feeds(user_ids)
+                self.log("home timelines", started)
+
+            for model in (User, Profile, Relation, Post, Comment, Like, PinnedPost, PinnedComment, FeedItem):
+                cursor.execute(sql.SQL("ANALYZE {}").format(sql.Identifier(model._meta.db_table)))
+
+        self.log("done", started)
+
+    def log(self, message, started):
+        self.stdout.write(f"[{time.perf_counter() - started:7.1f}s] {message}")
+
+    def copy(self, model, rows):
+        """
+        Write `rows`, an iterable of {column: value} dicts having the same keys, with a single COPY.
+        """
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            return 0
+
+        return copy_rows(self.cursor, model, list(first), (tuple(row.values()) for row in chain([first], rows)))
+
+    def words(self, low, high):
+        # content columns are varchar(300)
+        return ' '.join(self.random.choices(WORDS, k=self.random.randint(low, high)))[:300]
+
+    def amount(self, mean):
+        return int(self.random.expovariate(1 / mean)) if mean > 0 else 0
+
+    def moment(self, after=None):
+        start = after or self.now - timedelta(days=self.options['days'])
+        return start + (self.now - start) * self.random.random()
+
+    def pick_popular(self, count):
+        return set(self.random.choices(self.popular, cum_weights=self.popularity, k=count))
+
+    def generate_users(self):
+        # hashing is slow by design, every generated user shares one hash
+        password = make_password(self.options['password'])
+        user_ids = [self.next_id[User]() for _ in range(self.options['users'])]
+        private_ids = {user_id for user_id in user_ids if self.random.random() < self.options['private']}
+
+        for start in range(0, len(user_ids), self.options['chunk_size']):
+            chunk = user_ids[start:start + self.options['chunk_size']]
+            self.copy(User, (
+                {
+                    'id': user_id, 'password': password, 'last_login': None, 'is_superuser': False,
+                    'username': f"user{user_id}", 'email': f"user{user_id}@example.com",
+                    'first_name': self.random.choice(WORDS).title(), 'last_name': self.random.choice(WORDS).title(),
+                    'date_joined': self.moment(), 'is_staff': False, 'is_active': True,
+                } for user_id in chunk
+            ))
+            # written here since the `create_user_profile` signal does not run for copied users
+            self.copy(Profile, (
+                {
+                    'user_id': user_id, 'picture': '', 'phone_number': '', 'bio': self.words(0, 12),
+                    'private': user_id in private_ids, 'version': 1, 'modified': self.now,
+                    'follower_count': 0, 'following_count': 0, 'post_count': 0,
+                } for user_id in chunk
+            ))
+
+        return user_ids, private_ids
+
+    def generate_relations(self, actors, private_ids):
+        relations = []
+        for actor in actors:
+            for target in self.pick_popular(self.amount(self.options['follows'])) - {actor}:
+                if self.random.random() < 0.01:
+                    state = Relation.RelationChoices.BLOCKS
+                elif target in private_ids and self.random.random() < 0.3:
+                    state = Relation.RelationChoices.REQUESTED
+                else:
+                    state = Relation.RelationChoices.FOLLOWS
+                    self.follower_counts[target] += 1
+
+                relations.append({
+                    'actor_id': actor, 'target_id': target, 'state': state, 'date_modified': self.moment(),
+                    'is_active': True,
+                })
+
+        return {'relations': self.copy(Relation, relations)}
+
+    def generate_content(self, authors):
+        posts, comments, likes, pinned_posts, pinned_comments = [], [], [], [], []
+
+        for author in authors:
+            author_posts = []
+            for _ in range(self.amount(self.options['posts'])):
+                post = {
+                    'id': self.next_id[Post](), 'author_id': author, 'content': self.words(3, 40), 'image': None,
+                    'image_variants': '{}', 'file': None, 'created': self.moment(), 'like_count': 0, 'version': 1,
+                }
+                post['modified'] = post['created']
+                post['like_count'] = self.add_likes(likes, self.post_type, post, self.options['likes'])
+                for _ in range(self.amount(self.options['comments'])):
+                    self.add_comment(comments, likes, pinned_comments, post, parent=None)
+
+                posts.append(post)
+                author_posts.append(post)
+
+            if author_posts and self.random.random() < self.options['pins']:
+                pinned = self.random.sample(author_posts, min(len(author_posts), settings.PINNED_POST_LIMIT))
+                for position, post in enumerate(pinned, 1):
+                    pinned_posts.append({
+                        'user_id': author, 'post_id': post['id'], 'created': self.moment(post['created']),
+                        'is_active': True, 'position': position,
+                    })
+
+        return {
+            'posts': self.copy(Post, posts),
+            'comments': self.copy(Comment, comments),
+            'likes': self.copy(Like, likes),
+            'pinned posts': self.copy(PinnedPost, pinned_posts),
+            'pinned comments': self.copy(PinnedComment, pinned_comments),
+        }
+
+    def add_comment(self, comments, likes, pinned_comments, post, parent):
+        comment_id = self.next_id[Comment]()
+        author = self.random.choice(self.popular)
+        comment = {
+            'id': comment_id, 'author_id': author, 'post_id': post['id'], 'content': self.words(1, 30),
+            'created': self.moment((parent or post)['created']), 'parent_id': parent and parent['id'], 'like_count': 0,
+            'path': (parent['path'] if parent else '') + Comment.objects.path_step(comment_id),
+            'depth': parent['depth'] + 1 if parent else 0, 'reply_count': 0, 'version': 1,
+        }
+        comment['modified'] = comment['created']
+        comment['like_count'] = self.add_likes(likes, self.comment_type, comment, self.options['likes'] / 5)
+        comments.append(comment)
+
+        # a fraction of commenters pin, up to the limit
+        pins = self.random.random() < self.options['pins'] / 10
+        if pins and self.pinned_comments[author] < settings.PINNED_COMMENT_LIMIT:
+            self.pinned_comments[author] += 1
+            pinned_comments.append({
+                'user_id': author, 'comment_id': comment_id, 'created': self.moment(comment['created']),
+                'is_active': True, 'position': self.pinned_comments[author],
+            })
+
+        if comment['depth'] < MAX_COMMENT_DEPTH:
+            # deeper levels get fewer replies
+            for _ in range(self.amount(self.options['replies'] / 2 ** comment['depth'])):
+                self.add_comment(comments, likes, pinned_comments, post, parent=comment)
+                comment['reply_count'] += 1
+
+    def add_likes(self, likes, content_type, obj, mean):
+        users = self.pick_popular(self.amount(mean))
+        likes.extend(
+            {'user_id': user_id, 'content_type_id': content_type, 'object_id': obj['id'],
+             'created': self.moment(obj['created']), 'is_liked': True}
+            for user_id in users
+        )
+        return len(users)
+
+    def generate_feeds(self, user_ids):
+        # same entries as `FeedManager.fan_out` and `backfill` would have written, the posts of high fan-out authors
+        # are merged in at read time by `FeedManager.timeline`
+        high_fanout = [
+            user_id for user_id, count in self.follower_counts.items() if count > settings.FEED_FANOUT_LIMIT
+        ]
+        table = sql.Identifier(FeedItem._meta.db_table)
+        posts = sql.Identifier(Post._meta.db_table)
+        relations = sql.Identifier(Relation._meta.db_table)
+
+        for start in range(0, len(user_ids), self.options['chunk_size']):
+            owners = user_ids[start:start + self.options['chunk_size']]
+            self.cursor.execute(sql.SQL("""
+                INSERT INTO {table} (owner_id, post_id, author_id, created)
+                SELECT r.actor_id, p.id, p.author_id, p.created
+                FROM {relations} r CROSS JOIN LATERAL (
+                    SELECT id, author_id, created FROM {posts} WHERE author_id = r.target_id
+                    ORDER BY created DESC LIMIT %s
+                ) p
+                WHERE r.actor_id = ANY(%s) AND r.state = %s AND r.is_active AND NOT r.target_id = ANY(%s)
+                UNION ALL
+                SELECT author_id, id, author_id, created FROM {posts} WHERE author_id = ANY(%s)
+                ON CONFLICT DO NOTHING
+            """).format(table=table, posts=posts, relations=relations), [
+                settings.FEED_BACKFILL_SIZE, owners, Relation.RelationChoices.FOLLOWS, high_fanout, owners,
+            ])
@@ -0,0 +1,143 @@
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from posts.models import Post, Comment
+
+User = get_user_model()
+
+# name: (method, path template), the placeholders are filled with sampled ids
+ROUTES = {
+    'feed': ('GET', 'feed/'),
+    'own_posts': ('GET', 'posts/'),
+    'profile_posts': ('GET', 'profiles/{user}/posts/'),
+    'post': ('GET', 'posts/{post}/'),
+    'comments': ('GET', 'posts/{post}/comments/'),
+    'replies': ('GET', 'comments/{comment}/replies/'),
+    'thread': ('GET', 'posts/{post}/thread/'),
+    'post_likes': ('GET', 'posts/{post}/likes/'),
+    'profile': ('GET', 'profile/{user}/'),
+    'like': ('POST', 'posts/{post}/likes/'),
+    'comment': ('POST', 'posts/{post}/comments/'),
+}
+
+DEFAULT_MIX = 'feed=4,profile_posts=3,post=2,comments=3,replies=1,thread=1,post_likes=1,profile=2,like=1,comment=1'
+
+
+class Command(BaseCommand):
+    help = "Replay a weighted mix of API requests against a running server as authenticated users and report " \
+           "throughput and latency percentiles per route."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000/')
+        parser.add_argument('--mix', default=DEFAULT_MIX,
+                            help=f"comma separated route=weight pairs, routes: {', '.join(ROUTES)}")
+        parser.add_argument('--users', type=int, default=100, help="number of distinct users sending requests")
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--duration', type=float, default=30, help="seconds to run for")
+        parser.add_argument('--sample', type=int, default=1000, help="posts and comments sampled for the paths")
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--seed', type=int)
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.base_url = options['url'].rstrip('/') + '/'
+        names, weights = self.parse_mix(options['mix'])
+
+        seeds = random.Random(options['seed'])
+        users = list(User.objects.filter(is_active=True).order_by('?').values_list('id', flat=True)[:options['users']])
+        self.ids = {
+            'user': users,
+            'post': list(Post.objects.order_by('?').values_list('id', flat=True)[:options['sample']]),
+            'comment': list(Comment.objects.filter(reply_count__gt=0).order_by('?').values_list(
+                'id', flat=True)[:options['sample']]),
+        }
+        if not all(self.ids.values()):
+            raise CommandError("users, posts and replied comments are needed, see the generate_dataset command")
+
+        # signed locally, the server never sees a login
+        self.tokens = [str(AccessToken.for_user(User(id=user_id))) for user_id in users]
+
+        self.results = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+        deadline = time.perf_counter() + options['duration']
+
+        self.stdout.write(f"{options['concurrency']} workers, {len(users)} users, {options['duration']:.0f}s")
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            workers = [
+                executor.submit(self.worker, random.Random(None if options['seed'] is None else seeds.random()),
+                                names, weights, deadline)
+                for _ in range(options['concurrency'])
+            ]
+            for worker in workers:
+                worker.result()
+        elapsed = time.perf_counter() - started
+
+        self.report(elapsed)
+
+    def parse_mix(self, mix):
+        names, weights = [], []
+        for pair in mix.split(','):
+            name, _, weight = pair.partition('=')
+            if name.strip() not in ROUTES:
+                raise CommandError(f"unknown route '{name}', choose from: {', '.join(ROUTES)}")
+            names.append(name.strip())
+            weights.append(float(weight or 1))
+        return names, weights
+
+    def worker(self, rng, names, weights, deadline):
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            method, template = ROUTES[name]
+            path = template.format(**{key: rng.choice(ids) for key, ids in self.ids.items()})
+
+            data = b'{"content": "load test"}' if name == 'comment' else None
+            request = Request(self.base_url + path, data=data, method=method, headers={
+                'Authorization': f"Bearer {rng.choice(self.tokens)}",
+                'Content-Type': 'application/json',
+            })
+
+            started = time.perf_counter()
+            try:
+                with urlopen(request, timeout=self.options['timeout']) as response:
+                    response.read()
+                failed = False
+            except HTTPError as error:
+                # 4xx are answers too (e.g. a private profile), only server errors count as failures
+                failed = error.code >= 500
+            except (URLError, TimeoutError, ConnectionError):
+                failed = True
+            latency = time.perf_counter() - started
+
+            with self.lock:
+                self.results[name].append(latency)
+                if failed:
+                    self.errors[name] += 1
+
+    def report(self, elapsed):
+        self.stdout.write(f"{'route':<15}{'requests':>10}{'req/s':>9}{'errors':>8}{'p50':>9}{'p95':>9}{'p99':>9}")
+        everything = []
+        for name, latencies in sorted(self.results.items()):
+            everything.extend(latencies)
+            self.stdout.write(self.line(name, latencies, self.errors[name], elapsed))
+        self.stdout.write(self.line('total', everything, sum(self.errors.values()), elapsed))
+
+    def line(self, name, latencies, errors, elapsed):
+        if len(latencies) > 1:
+            percentiles = statistics.quantiles(latencies, n=100)
+            p50, p95, p99 = (percentiles[i] * 1000 for i in (49, 94, 98))
+        else:
+            p50 = p95 = p99 = sum(latencies) * 1000
+        return f"{name:<15}{len(latencies):>10}{len(latencies) / elapsed:>9.1f}{errors:>8}" \
+               f"{p50:>7.1f}ms{p95:>7.1f}ms{p99:>7.1f}ms"
@@ -0,0 +1,37 @@
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from posts.models import Post, Comment, Like
+from social_network.batching import id_chunks
+from social_network.conditional import bump_version
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized like_count of posts and comments from Like rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+
+        for model in (Post, Comment):
+            updated = self.reconcile(model, chunk_size)
+            self.stdout.write(f"{model.__name__}: {updated} rows reconciled")
+
+    def reconcile(self, model, chunk_size):
+        content_type = ContentType.objects.get_for_model(model)
+        like_count = Like.objects.filter(
+            content_type=content_type, object_id=OuterRef('pk'), is_liked=True
+        ).order_by().values('object_id').annotate(count=Count('id')).values('count')
+
+        updated = 0
+        for ids in id_chunks(model.objects.all(), 'pk', chunk_size):
+            # only drifted rows are written, which keeps the version stamps of the others
+            actual = Coalesce(Subquery(like_count), 0)
+            drifted = model.objects.filter(pk__in=ids).exclude(like_count=actual)
+            updated += bump_version(drifted, like_count=actual)
+
+        return updated
@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.models import TrendingHashtag
+
+
+class Command(BaseCommand):
+    help = "Recompute the trending hashtags from the hourly usage counters, meant to run every few minutes."
+
+    def handle(self, *args, **options):
+        trending = TrendingHashtag.objects.refresh()
+        self.stdout.write(f"{len(trending)} trending hashtags over the last {settings.TRENDING_WINDOW_HOURS} hours")
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.4 on 2026-10-18 10:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("posts", "0004_feeditem"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["post", "-created", "id"], name="posts_comme_post_id_8e6698_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["parent", "-created", "id"],
+                name="posts_comme_parent__23afb0_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="like",
+            index=models.Index(
+                condition=models.Q(("is_liked", True)),
+                fields=["content_type", "object_id", "-created", "id"],
+                name="like_liked_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["author", "-created", "id"],
+                name="posts_post_author__5fb85a_idx",
+            ),
+        ),
+    ]
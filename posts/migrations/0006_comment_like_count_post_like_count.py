@@ -0,0 +1,51 @@
+# Generated by Django 5.1.4 on 2026-10-18 10:58
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_like_counts(apps, schema_editor):
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    Like = apps.get_model("posts", "Like")
+
+    for model_name in ("post", "comment"):
+        model = apps.get_model("posts", model_name)
+        content_type = ContentType.objects.filter(
+            app_label="posts", model=model_name
+        ).first()
+        if content_type is None:
+            continue
+
+        like_count = (
+            Like.objects.filter(
+                content_type=content_type, object_id=OuterRef("pk"), is_liked=True
+            )
+            .order_by()
+            .values("object_id")
+            .annotate(count=Count("id"))
+            .values("count")
+        )
+        model.objects.update(like_count=Coalesce(Subquery(like_count), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("posts", "0005_comment_posts_comme_post_id_8e6698_idx_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="comment",
+            name="like_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="like_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(populate_like_counts, migrations.RunPython.noop),
+    ]
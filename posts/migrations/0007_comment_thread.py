@@ -0,0 +1,68 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:02
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.http import int_to_base36
+
+
+def populate_comment_threads(apps, schema_editor):
+    Comment = apps.get_model("posts", "Comment")
+
+    # walk the threads level by level, starting from top-level comments
+    parents = {None: ("", -1)}
+    level = Comment.objects.filter(parent__isnull=True)
+    while comments := list(level.only("id", "parent_id")):
+        for comment in comments:
+            path, depth = parents[comment.parent_id]
+            comment.path = path + int_to_base36(comment.id).zfill(8)
+            comment.depth = depth + 1
+
+        Comment.objects.bulk_update(comments, ["path", "depth"], batch_size=1000)
+        parents = {comment.id: (comment.path, comment.depth) for comment in comments}
+        level = Comment.objects.filter(parent_id__in=list(parents))
+
+    reply_count = (
+        Comment.objects.filter(parent=OuterRef("pk"))
+        .order_by()
+        .values("parent")
+        .annotate(count=Count("id"))
+        .values("count")
+    )
+    Comment.objects.update(reply_count=Coalesce(Subquery(reply_count), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0006_comment_like_count_post_like_count"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="comment",
+            name="depth",
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="path",
+            field=models.CharField(
+                db_collation="C", default="", editable=False, max_length=1024
+            ),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="reply_count",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["post", "path"], name="posts_comme_post_id_abd11d_idx"
+            ),
+        ),
+        migrations.RunPython(populate_comment_threads, migrations.RunPython.noop),
+    ]
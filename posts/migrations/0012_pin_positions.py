@@ -0,0 +1,99 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:42
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+
+def populate_pin_positions(apps, schema_editor):
+    for model_name, limit in (
+        ("pinnedpost", settings.PINNED_POST_LIMIT),
+        ("pinnedcomment", settings.PINNED_COMMENT_LIMIT),
+    ):
+        model = apps.get_model("posts", model_name)
+        # in pinning order, pins over the limit (left by concurrent toggles) are unpinned
+        pins = list(
+            model.objects.filter(is_active=True)
+            .annotate(
+                rank=Window(
+                    RowNumber(),
+                    partition_by=[F("user")],
+                    order_by=[F("created").asc(), F("id").asc()],
+                )
+            )
+            .only("id")
+        )
+        for pin in pins:
+            pin.is_active = pin.rank <= limit
+            pin.position = pin.rank if pin.is_active else None
+
+        model.objects.bulk_update(pins, ["is_active", "position"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0011_version_stamps"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="pinnedcomment",
+            name="position",
+            field=models.PositiveSmallIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="pinnedpost",
+            name="position",
+            field=models.PositiveSmallIntegerField(editable=False, null=True),
+        ),
+        migrations.RunPython(populate_pin_positions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="pinnedcomment",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("is_active", True)),
+                fields=("user", "position"),
+                name="pinnedcomment_active_position_unique",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="pinnedcomment",
+            constraint=models.CheckConstraint(
+                condition=models.Q(
+                    ("is_active", False),
+                    models.Q(
+                        ("position__gte", 1),
+                        ("position__isnull", False),
+                        ("position__lte", 3),
+                    ),
+                    _connector="OR",
+                ),
+                name="pinnedcomment_position_check",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="pinnedpost",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("is_active", True)),
+                fields=("user", "position"),
+                name="pinnedpost_active_position_unique",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="pinnedpost",
+            constraint=models.CheckConstraint(
+                condition=models.Q(
+                    ("is_active", False),
+                    models.Q(
+                        ("position__gte", 1),
+                        ("position__isnull", False),
+                        ("position__lte", 3),
+                    ),
+                    _connector="OR",
+                ),
+                name="pinnedpost_position_check",
+            ),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0012_pin_positions"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="feeditem",
+            name="posts_feedi_owner_i_d70a03_idx",
+        ),
+        migrations.AddIndex(
+            model_name="feeditem",
+            index=models.Index(
+                fields=["owner", "-created", "-post"],
+                name="posts_feedi_owner_i_2c7a7d_idx",
+            ),
+        ),
+    ]
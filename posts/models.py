@@ -1,47 +1,215 @@
-from django.db import models
+from contextlib import nullcontext
+from datetime import timedelta
+from itertools import chain, islice
+
+from django.db import IntegrityError, connections, models, transaction
 from django.conf import settings
+from django.utils import timezone
+from django.utils.http import int_to_base36
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
-from django.db.models import Exists, OuterRef
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, SearchVectorField
+from django.db.models import Exists, ExpressionWrapper, OuterRef, F, Func, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, Length
+
+from profiles.models import Profile, Relation
+from social_network.conditional import VersionedModel, bump_version
+from .tags import extract_hashtags, mentioned_users
+
+# text search configuration of the post and comment search vectors
+SEARCH_CONFIG = 'english'
+
+# pin position given to unpinned items in listings, after every real one
+UNPINNED_POSITION = 32767
 
 
 class ModelPinManager(models.Manager):
 
-    def list_with_pin_filter(self, item_model):
+    def with_pin_state(self, item_model):
         lookup_field = {
-            f"{self.model.__name__}_id".lower(): OuterRef('pk')
+            f"{self.model.__name__}_id".lower(): OuterRef('pk'),
+            "user": OuterRef('author'),
         }
+        position = item_model.objects.active().filter(**lookup_field).values('position')
         return self.annotate(
-            is_pinned=Exists(
-                item_model.objects.filter(**lookup_field)
-            )
-        ).order_by('-is_pinned', '-created')
+            pin_position=Coalesce(Subquery(position), UNPINNED_POSITION),
+        ).annotate(
+            is_pinned=ExpressionWrapper(models.Q(pin_position__lt=UNPINNED_POSITION),
+                                        output_field=models.BooleanField()),
+        )
+
+    def list_with_pin_filter(self, item_model):
+        # pinned items first, by pin position
+        return self.with_pin_state(item_model).order_by('pin_position', '-created', 'id')
 
 
-class Post(models.Model):
+class ContentManager(ModelPinManager):
+
+    def visibility(self, viewer):
+        """
+        Condition matching the rows `viewer` may see, applicable to any queryset of the model.
+        """
+        return Relation.objects.visibility_filter(viewer, 'author')
+
+    def visible_to(self, viewer):
+        return self.filter(self.visibility(viewer))
+
+    def search(self, terms, viewer):
+        """
+        Visible rows matching the web search style `terms`, annotated with their ``rank``.
+        """
+        query = SearchQuery(terms, config=SEARCH_CONFIG, search_type='websearch')
+        return self.visible_to(viewer).filter(search_vector=query).annotate(
+            # ts_rank is a real, as text it loses precision and cursors would not match the exact value again
+            rank=Cast(SearchRank(F('search_vector'), query), models.FloatField())
+        )
+
+
+class TaggedContent(VersionedModel):
+    """
+    A post or comment, whose hashtags and mentions are extracted from ``content`` when it is saved, see
+    `posts.signals.tag_content`.
+    """
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'content' in field_names:
+            instance._tagged_content = values[field_names.index('content')]
+        return instance
+
+    def content_changed(self, update_fields=None):
+        """
+        Whether a save of `update_fields` wrote a ``content`` other than the one last tagged.
+        """
+        if update_fields is not None and 'content' not in update_fields:
+            return False
+        return getattr(self, '_tagged_content', None) != self.content
+
+
+class Post(TaggedContent):
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
     content = models.CharField(max_length=300)
     image = models.ImageField(null=True)
+    image_variants = models.JSONField(default=dict, editable=False)
     file = models.FileField(null=True)
     created = models.DateTimeField(auto_now_add=True)
     likes = GenericRelation('Like')
+    like_count = models.IntegerField(default=0)
+    hashtags = models.ManyToManyField('Hashtag', through='PostHashtag', related_name='posts')
+    mentions = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='post_mentions')
+    # maintained by the database on every write
+    search_vector = models.GeneratedField(
+        expression=SearchVector('content', config=SEARCH_CONFIG),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    objects = ContentManager()
+    atomic_fields = ('like_count', 'image_variants')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["author", "-created", "id"]),
+            GinIndex(fields=["search_vector"], name="post_search_vector_idx"),
+        ]
+
+
+class CommentManager(ContentManager):
+    # every level of a comment's path is its id in fixed width base 36, so sorting by path walks the thread
+    PATH_STEP_LENGTH = 8
+    # sorts after every path step, bounds the path range of a subtree
+    PATH_END = '~'
+
+    def path_step(self, pk):
+        return int_to_base36(pk).zfill(self.PATH_STEP_LENGTH)
+
+    def attach_to_thread(self, comment):
+        parent = comment.parent
+        comment.path = (parent.path if parent else '') + self.path_step(comment.pk)
+        comment.depth = parent.depth + 1 if parent else 0
+
+        self.filter(pk=comment.pk).update(path=comment.path, depth=comment.depth)
+        if parent:
+            bump_version(self.filter(pk=parent.pk), reply_count=F('reply_count') + 1)
+
+        return comment
+
+    def detach_from_thread(self, comment):
+        """
+        Undo `attach_to_thread` for a deleted `comment`: its parent loses a reply, and its replies, left without a
+        parent, become roots along with their subtrees.
+        """
+        if comment.parent_id is not None:
+            bump_version(self.filter(pk=comment.parent_id), reply_count=F('reply_count') - 1)
 
-    objects = ModelPinManager()
+        if not comment.path:
+            return comment
 
+        # the replies' paths are matched on the deleted comment's step rather than its path, which is stale when
+        # an ancestor deleted along with it was detached first
+        below = rf'^(.{{{self.PATH_STEP_LENGTH}}})*?{self.path_step(comment.pk)}'
+        path = Func(F('path'), Value(below), Value(''), function='regexp_replace')
+        bump_version(
+            self.filter(post_id=comment.post_id, path__regex=below + '.'),
+            path=path, depth=Length(path) / self.PATH_STEP_LENGTH - 1,
+        )
+        return comment
 
-class Comment(models.Model):
+    def thread(self, post_id, root=None, depth=None):
+        queryset = self.filter(post_id=post_id)
+
+        if root is not None:
+            queryset = queryset.filter(path__gte=root.path, path__lt=root.path + self.PATH_END)
+
+        if depth is not None:
+            queryset = queryset.filter(depth__lte=(root.depth if root else 0) + depth)
+
+        return queryset.order_by('path')
+
+    def visibility(self, viewer):
+        # comments follow the visibility of their post, and are hidden between users blocking each other
+        return Relation.objects.visibility_filter(viewer, 'post__author') & ~Relation.objects.blocked_filter(
+            viewer, 'author')
+
+
+class Comment(TaggedContent):
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
     post = models.ForeignKey('Post', on_delete=models.SET_NULL, null=True)
     content = models.CharField(max_length=300)
     created = models.DateTimeField(auto_now_add=True)
     parent = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, related_name='replies')
     likes = GenericRelation('Like')
+    like_count = models.IntegerField(default=0)
+    path = models.CharField(max_length=1024, default='', editable=False, db_collation='C')
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    reply_count = models.IntegerField(default=0, editable=False)
+    hashtags = models.ManyToManyField('Hashtag', related_name='comments')
+    mentions = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='comment_mentions')
+    search_vector = models.GeneratedField(
+        expression=SearchVector('content', config=SEARCH_CONFIG),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
 
-    objects = ModelPinManager()
+    objects = CommentManager()
+    atomic_fields = ('like_count', 'reply_count')
 
     def is_reply(self):
         return self.parent is not None
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["post", "-created", "id"]),
+            models.Index(fields=["parent", "-created", "id"]),
+            models.Index(fields=["post", "path"]),
+            GinIndex(fields=["search_vector"], name="comment_search_vector_idx"),
+        ]
+
 
 class LikeManager(models.Manager):
 
@@ -52,13 +220,57 @@ class LikeManager(models.Manager):
     def get_object(self, model, object_id, user):
         return self.filter_for_object(model, object_id).filter(user=user).first()
 
+    def visibility(self, model, object_id, viewer):
+        """
+        Condition matching the likes of `model` `object_id` that `viewer` may see: none when the object itself is
+        hidden from them, and never those of users blocking or blocked by them.
+        """
+        # not correlated to the like rows, so the object is checked once per query rather than once per row
+        target = Exists(model.objects.visible_to(viewer).filter(pk=object_id))
+        return target & ~Relation.objects.blocked_filter(viewer, 'user')
+
+    def liked_ids(self, user, object_ids):
+        """
+        Return the ids `user` likes out of `object_ids`, a mapping of model to ids, using a single query.
+        """
+        content_types = ContentType.objects.get_for_models(*object_ids)
+        condition = models.Q()
+        for model, ids in object_ids.items():
+            condition |= models.Q(content_type=content_types[model], object_id__in=ids)
+
+        liked = {model: [] for model in object_ids}
+        models_by_content_type = {content_type.id: model for model, content_type in content_types.items()}
+        for content_type_id, object_id in self.filter(condition, user=user, is_liked=True).values_list(
+                'content_type_id', 'object_id'):
+            liked[models_by_content_type[content_type_id]].append(object_id)
+
+        return liked
+
     def toggle_like_for(self, model, object_id, user):
         content_type = ContentType.objects.get_for_model(model)
-        obj, _ = self.get_or_create(content_type_id=content_type.id, object_id=object_id, user=user)
-        obj.is_liked = not obj.is_liked
+        table = self.model._meta.db_table
+
+        # a single upsert flips the row atomically, relying on the (content_type, object_id, user) unique constraint
+        sql = f"""
+            INSERT INTO {table} (user_id, content_type_id, object_id, created, is_liked)
+            VALUES (%s, %s, %s, %s, true)
+            ON CONFLICT (content_type_id, object_id, user_id)
+            DO UPDATE SET is_liked = NOT {table}.is_liked
+            RETURNING id, is_liked
+        """
 
-        obj.save(update_fields=['is_liked'])
-        return obj
+        with transaction.atomic(using=self.db):
+            with connections[self.db].cursor() as cursor:
+                cursor.execute(sql, [user.pk, content_type.id, object_id, timezone.now()])
+                pk, is_liked = cursor.fetchone()
+
+            bump_version(model.objects.filter(pk=object_id), like_count=F('like_count') + (1 if is_liked else -1))
+
+        return self.model.from_db(
+            self.db,
+            ['id', 'user_id', 'content_type_id', 'object_id', 'is_liked'],
+            [pk, user.pk, content_type.id, object_id, is_liked],
+        )
 
 
 class Like(models.Model):
@@ -74,6 +286,8 @@ class Like(models.Model):
     class Meta:
         indexes = [
             models.Index(fields=["content_type", "object_id"]),
+            models.Index(fields=["content_type", "object_id", "-created", "id"], condition=models.Q(is_liked=True),
+                         name="like_liked_created_idx"),
         ]
         unique_together = ('content_type', 'object_id', 'user')
 
@@ -82,18 +296,317 @@ class PinManager(models.Manager):
     def active(self):
         return self.filter(is_active=True)
 
+    def is_pinned(self, obj):
+        lookup_field = {
+            f"{obj.__class__.__name__}_id".lower(): obj.pk
+        }
+        return self.active().filter(user_id=obj.author_id, **lookup_field).exists()
+
+    def pinned_ids(self, model, object_ids):
+        object_field = model.__name__.lower()
+        lookup_field = {
+            f"{object_field}_id__in": object_ids,
+            "user": F(f"{object_field}__author"),
+        }
+        return list(self.active().filter(**lookup_field).values_list(f"{object_field}_id", flat=True))
+
+    def toggle(self, model, object_id, user, limit):
+        """
+        Pin or unpin `model` `object_id` for its author `user` with a single statement, bumping the object's version.
+
+        Pins take the lowest free position up to `limit`. Concurrent pins racing for the same position are rejected
+        by the active position constraint and retried, so the limit holds without locking.
+
+        :return: a (author id, is active, was active) tuple, ``None`` when the object does not exist. Nothing is
+            toggled when `user` is not the author, and a pin is left inactive when no position is free.
+        """
+        table = self.model._meta.db_table
+        field = f"{model.__name__.lower()}_id"
+        sql = f"""
+            WITH target AS (
+                SELECT id, author_id FROM {model._meta.db_table} WHERE id = %(object)s
+            ), previous AS (
+                SELECT is_active FROM {table} WHERE {field} = %(object)s
+            ), slot AS (
+                SELECT MIN(p) AS position FROM generate_series(1, %(limit)s) p
+                WHERE NOT EXISTS (SELECT 1 FROM {table} WHERE user_id = %(user)s AND is_active AND position = p)
+            ), toggled AS (
+                INSERT INTO {table} AS pin (user_id, {field}, created, is_active, position)
+                SELECT %(user)s, target.id, %(now)s, slot.position IS NOT NULL, slot.position FROM target, slot
+                WHERE target.author_id = %(user)s AND (slot.position IS NOT NULL OR EXISTS (SELECT 1 FROM previous))
+                ON CONFLICT ({field}) DO UPDATE SET
+                    is_active = NOT pin.is_active AND EXCLUDED.is_active,
+                    position = CASE WHEN pin.is_active THEN NULL ELSE EXCLUDED.position END,
+                    user_id = EXCLUDED.user_id,
+                    created = EXCLUDED.created
+                RETURNING pin.{field}, pin.is_active
+            ), bumped AS (
+                -- same as `bump_version`
+                UPDATE {model._meta.db_table} SET version = version + 1, modified = %(now)s
+                WHERE id IN (SELECT {field} FROM toggled)
+            )
+            SELECT target.author_id, (SELECT is_active FROM toggled), (SELECT is_active FROM previous) FROM target
+        """
+        params = {'object': object_id, 'user': user.pk, 'limit': limit}
+
+        connection = connections[self.db]
+        # each retry is a new statement, which sees the pins committed by the transaction it lost to
+        for attempt in range(limit + 1):
+            # the statement is atomic on its own, a savepoint is only needed to retry within a transaction
+            savepoint = transaction.atomic(using=self.db) if connection.in_atomic_block else nullcontext()
+            try:
+                with savepoint, connection.cursor() as cursor:
+                    cursor.execute(sql, {**params, 'now': timezone.now()})
+                    return cursor.fetchone()
+            except IntegrityError:
+                if attempt == limit:
+                    raise
+
 
 class PinnedComment(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
     comment = models.OneToOneField('Comment', on_delete=models.CASCADE)
     created = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
+    # 1 to the pin limit while active, see `PinManager.toggle`
+    position = models.PositiveSmallIntegerField(null=True, editable=False)
     objects = PinManager()
 
+    class Meta:
+        constraints = [
+            # also the index counting and ordering a user's active pins
+            models.UniqueConstraint(fields=['user', 'position'], condition=models.Q(is_active=True),
+                                    name='pinnedcomment_active_position_unique'),
+            models.CheckConstraint(
+                condition=models.Q(is_active=False) | models.Q(
+                    position__isnull=False, position__gte=1, position__lte=settings.PINNED_COMMENT_LIMIT),
+                name='pinnedcomment_position_check',
+            ),
+        ]
+
 
 class PinnedPost(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
     post = models.OneToOneField(Post, on_delete=models.CASCADE)
     created = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
+    # 1 to the pin limit while active, see `PinManager.toggle`
+    position = models.PositiveSmallIntegerField(null=True, editable=False)
     objects = PinManager()
+
+    class Meta:
+        constraints = [
+            # also the index counting and ordering a user's active pins
+            models.UniqueConstraint(fields=['user', 'position'], condition=models.Q(is_active=True),
+                                    name='pinnedpost_active_position_unique'),
+            models.CheckConstraint(
+                condition=models.Q(is_active=False) | models.Q(
+                    position__isnull=False, position__gte=1, position__lte=settings.PINNED_POST_LIMIT),
+                name='pinnedpost_position_check',
+            ),
+        ]
+
+
+class FeedManager(models.Manager):
+
+    def high_fanout_authors(self, owner):
+        followings = Relation.objects.followings(owner).values('target')
+        return Profile.objects.filter(
+            user__in=followings, follower_count__gt=settings.FEED_FANOUT_LIMIT
+        ).values_list('user', flat=True)
+
+    def fan_out(self, post):
+        if Profile.objects.filter(user=post.author_id, follower_count__gt=settings.FEED_FANOUT_LIMIT).exists():
+            # high fan-out authors are merged into their followers' feeds at read time, see `timeline()`
+            return self._bulk_insert(post, [post.author_id])
+
+        followers = Relation.objects.followers(post.author_id)
+        owners = followers.values_list('actor_id', flat=True).iterator(chunk_size=settings.FEED_BATCH_SIZE)
+        return self._bulk_insert(post, chain([post.author_id], owners))
+
+    def _bulk_insert(self, post, owners):
+        owners = iter(owners)
+        inserted = 0
+
+        while batch := list(islice(owners, settings.FEED_BATCH_SIZE)):
+            self.bulk_create(
+                [self.model(owner_id=owner, post=post, author_id=post.author_id, created=post.created)
+                 for owner in batch],
+                ignore_conflicts=True
+            )
+            inserted += len(batch)
+
+        return inserted
+
+    def backfill(self, owner, author):
+        posts = Post.objects.filter(author=author).order_by('-created')[:settings.FEED_BACKFILL_SIZE]
+        return self.bulk_create(
+            [self.model(owner_id=owner, post_id=post_id, author_id=author, created=created)
+             for post_id, created in posts.values_list('id', 'created')],
+            ignore_conflicts=True
+        )
+
+    def prune(self, owner, author):
+        return self.filter(owner=owner, author=author).delete()
+
+    def timeline(self, owner, condition=models.Q()):
+        """
+        Return the home timeline of `owner` as querysets sharing the ("-feed_created", "-id") ordering, to be merged
+        by `KeysetCursorPagination`: the materialized entries, and the posts of followed high fan-out authors which
+        are never written into feeds.
+        """
+        entries = Post.objects.with_pin_state(PinnedPost).filter(condition, feed_entries__owner=owner).annotate(
+            feed_created=F('feed_entries__created'),
+        )
+        pulled = Post.objects.with_pin_state(PinnedPost).filter(
+            condition, author__in=self.high_fanout_authors(owner)
+        ).exclude(
+            # entries written before the author crossed FEED_FANOUT_LIMIT
+            Exists(self.filter(owner=owner, post=OuterRef('pk')))
+        ).annotate(
+            feed_created=F('created'),
+        )
+        return [entries.order_by('-feed_created', '-id'), pulled.order_by('-feed_created', '-id')]
+
+
+class FeedItem(models.Model):
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='feed')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='feed_entries')
+    author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    created = models.DateTimeField()
+
+    objects = FeedManager()
+
+    class Meta:
+        indexes = [
+            # a timeline page is a range scan in ("-feed_created", "-id") order, `id` being the post's
+            models.Index(fields=["owner", "-created", "-post"]),
+            models.Index(fields=["owner", "author"]),
+        ]
+        unique_together = ('owner', 'post')
+
+
+class HashtagManager(models.Manager):
+
+    def get_or_create_all(self, names):
+        if not names:
+            return []
+        self.bulk_create([self.model(name=name) for name in names], ignore_conflicts=True)
+        return list(self.filter(name__in=names))
+
+    def tag(self, obj, created=True):
+        """
+        Store the hashtags and mentions of a post or comment's content, replacing the previous ones.
+
+        Only newly `created` content counts towards the trending hashtags.
+        """
+        hashtags = self.get_or_create_all(extract_hashtags(obj.content))
+        if isinstance(obj, Post):
+            obj.hashtags.set(hashtags, through_defaults={'created': obj.created})
+        else:
+            obj.hashtags.set(hashtags)
+        obj.mentions.set(mentioned_users(obj.mentions.model, obj.content))
+
+        if created and hashtags:
+            HashtagActivity.objects.record(hashtags, obj.created)
+        obj._tagged_content = obj.content
+        return hashtags
+
+    def tagged_posts(self, name):
+        return Post.objects.with_pin_state(PinnedPost).filter(hashtag_entries__hashtag__name=name).annotate(
+            tagged_created=F('hashtag_entries__created'),
+            tagged_id=F('hashtag_entries__id'),
+        ).order_by('-tagged_created', '-tagged_id')
+
+
+class Hashtag(models.Model):
+    # lowercase, see `tags.normalize`
+    name = models.CharField(max_length=100, unique=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    objects = HashtagManager()
+
+
+class PostHashtag(models.Model):
+    # both are covered by the leading columns of the unique constraint and the index below
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='hashtag_entries', db_index=False)
+    hashtag = models.ForeignKey(Hashtag, on_delete=models.CASCADE, related_name='post_entries', db_index=False)
+    # copy of the post's, so the posts of a tag are read newest first from the index alone
+    created = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["hashtag", "-created", "-id"]),
+        ]
+        unique_together = ('post', 'hashtag')
+
+
+class HashtagActivityManager(models.Manager):
+
+    def bucket(self, moment):
+        return moment.replace(minute=0, second=0, microsecond=0)
+
+    def record(self, hashtags, moment):
+        table = self.model._meta.db_table
+        values = ', '.join(['(%s, %s, 1)'] * len(hashtags))
+        params = [param for hashtag in hashtags for param in (hashtag.pk, self.bucket(moment))]
+
+        # increments in place, concurrent writers of the same tag and hour never lose a count
+        sql = f"""
+            INSERT INTO {table} (hashtag_id, hour, count)
+            VALUES {values}
+            ON CONFLICT (hashtag_id, hour)
+            DO UPDATE SET count = {table}.count + EXCLUDED.count
+        """
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(sql, params)
+
+
+class HashtagActivity(models.Model):
+    """
+    Uses of a hashtag by new posts and comments during one hour.
+    """
+    hashtag = models.ForeignKey(Hashtag, on_delete=models.CASCADE, related_name='activity')
+    hour = models.DateTimeField()
+    count = models.IntegerField(default=0)
+
+    objects = HashtagActivityManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["hour"]),
+        ]
+        unique_together = ('hashtag', 'hour')
+
+
+class TrendingHashtagManager(models.Manager):
+
+    def refresh(self, now=None):
+        """
+        Recompute the top hashtags over the last ``TRENDING_WINDOW_HOURS`` and drop the buckets that left the window.
+        """
+        now = now or timezone.now()
+        since = HashtagActivity.objects.bucket(now) - timedelta(hours=settings.TRENDING_WINDOW_HOURS - 1)
+        top = HashtagActivity.objects.filter(hour__gte=since).values('hashtag').annotate(
+            total=Sum('count')
+        ).order_by('-total', 'hashtag')[:settings.TRENDING_SIZE]
+
+        with transaction.atomic(using=self.db):
+            # readers keep seeing the previous ranking until the swap commits
+            self.all().delete()
+            trending = self.bulk_create([
+                self.model(hashtag_id=row['hashtag'], position=position, count=row['total'], refreshed=now)
+                for position, row in enumerate(top, start=1)
+            ])
+            HashtagActivity.objects.filter(hour__lt=since).delete()
+
+        return trending
+
+
+class TrendingHashtag(models.Model):
+    hashtag = models.OneToOneField(Hashtag, on_delete=models.CASCADE, related_name='+')
+    position = models.PositiveSmallIntegerField(unique=True)
+    count = models.IntegerField()
+    refreshed = models.DateTimeField()
+
+    objects = TrendingHashtagManager()
@@ -0,0 +1,187 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, Cursor
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def _reverse_ordering(ordering):
+    return tuple(order[1:] if order.startswith('-') else f"-{order}" for order in ordering)
+
+
+def keyset_filter(ordering, position):
+    """
+    Build the lexicographic "comes after `position`" condition for `ordering`.
+
+    (-a, -b, c) after (x, y, z) becomes: a < x OR (a = x AND b < y) OR (a = x AND b = y AND c > z)
+    """
+    condition = Q()
+    equal = {}
+
+    for order, value in zip(ordering, position):
+        field_name = order.lstrip('-')
+        lookup = 'lt' if order.startswith('-') else 'gt'
+        condition |= Q(**equal, **{f"{field_name}__{lookup}": value})
+        equal[field_name] = value
+
+    return condition
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Opaque cursor pagination keyed on every field of the ordering.
+
+    Unlike `CursorPagination`, the cursor holds the full position of the boundary row so pages are
+    fetched with a keyset condition only, no OFFSET is ever used. The ordering is taken from the view's
+    `ordering` attribute, then from the queryset's own `order_by()`, and must end with a unique field.
+
+    The queryset may also be a list of querysets returning the same columns in the same ordering. Each one is paged
+    on its own, on its own index, and the pages are merged by a UNION in the same query.
+    """
+    ordering = ('-created', 'id')
+
+    def get_ordering(self, request, queryset, view):
+        if isinstance(queryset, list):
+            queryset = queryset[0]
+        ordering = getattr(view, 'ordering', None) or queryset.query.order_by or self.ordering
+        if isinstance(ordering, str):
+            return (ordering,)
+        return tuple(ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.prepare(queryset, request, view):
+            return None
+
+        results = list(self.get_page_queryset(queryset, self.cursor))
+        self.set_page(results)
+        return self.page
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        if not self.prepare(queryset, request, view):
+            return [obj async for obj in queryset]
+
+        results = [obj async for obj in self.get_page_queryset(queryset, self.cursor)]
+        self.set_page(results)
+        return self.page
+
+    def prepare(self, queryset, request, view):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return False
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is not None:
+            self.cursor = self.cursor._replace(position=self.parse_position(queryset, self.cursor.position))
+        return True
+
+    def parse_position(self, queryset, position):
+        """
+        Convert the values of a decoded position to the types of their ordering fields, a tampered cursor is
+        rejected like an undecodable one.
+        """
+        query = (queryset[0] if isinstance(queryset, list) else queryset).query.chain()
+        try:
+            position = [
+                query.resolve_ref(order.lstrip('-')).output_field.to_python(value)
+                for order, value in zip(self.ordering, position)
+            ]
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+        # the ordering fields are never null, and a null cannot be compared with
+        if None in position:
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def get_page_queryset(self, queryset, cursor):
+        ordering = _reverse_ordering(self.ordering) if cursor and cursor.reverse else self.ordering
+        parts = queryset if isinstance(queryset, list) else [queryset]
+        pages = []
+        for part in parts:
+            part = part.order_by(*ordering)
+            if cursor is not None:
+                part = part.filter(keyset_filter(ordering, cursor.position))
+            # fetch one extra row to find out whether there is a following page
+            pages.append(part[:self.page_size + 1])
+
+        if len(pages) == 1:
+            return pages[0]
+        return pages[0].union(*pages[1:], all=True).order_by(*ordering)[:self.page_size + 1]
+
+    def set_page(self, results):
+        reverse = self.cursor is not None and self.cursor.reverse
+        has_following = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_following
+        else:
+            self.has_next, self.has_previous = has_following, self.cursor is not None
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+
+        position = self._get_position_from_instance(self.page[-1], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+
+        position = self._get_position_from_instance(self.page[0], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            tokens = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            position = tokens['p']
+            reverse = bool(tokens.get('r', False))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        return Cursor(offset=0, reverse=reverse, position=position)
+
+    def encode_cursor(self, cursor):
+        tokens = {'p': cursor.position}
+        if cursor.reverse:
+            tokens['r'] = 1
+
+        encoded = urlsafe_b64encode(json.dumps(tokens, separators=(',', ':')).encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _get_position_from_instance(self, instance, ordering):
+        position = []
+        for order in ordering:
+            field_name = order.lstrip('-')
+            value = instance[field_name] if isinstance(instance, dict) else getattr(instance, field_name)
+            # isoformat keeps microseconds, which the keyset comparison needs to stay exact
+            position.append(value.isoformat() if isinstance(value, date) else value)
+
+        return position
@@ -3,4 +3,5 @@ from rest_framework.permissions import BasePermission
 
 class IsAuthor(BasePermission):
     def has_object_permission(self, request, view, obj):
-        return request.user == obj.author
+        # compares ids, the author row is never loaded
+        return obj.author_id is not None and obj.author_id == request.user.id
@@ -0,0 +1,97 @@
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, DurationField, ExpressionWrapper, F, FloatField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Extract
+from django.utils import timezone
+
+from profiles.models import Relation
+from .models import Post, Comment
+
+# columns of `Candidates.features`, in this order
+FEATURES = ('age', 'likes', 'comments', 'affinity')
+
+
+class Candidates:
+    """
+    The posts considered for one ranked feed: their ids and a (post, feature) matrix, see `FEATURES`.
+
+    Age is in hours, affinity is the number of the viewer's likes on the author's posts.
+    """
+
+    def __init__(self, ids, features):
+        self.ids = ids
+        self.features = features
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def load_candidates(viewer, limit=None, window_hours=None, now=None):
+    """
+    Fetch the latest posts of the authors `viewer` follows, at most `limit` of them, along with their features.
+    """
+    limit = limit or settings.FEED_RANKING_CANDIDATES
+    window_hours = window_hours or settings.FEED_RANKING_WINDOW_HOURS
+    now = now or timezone.now()
+
+    # followed authors pass the private profile check of `ContentManager.visibility`, only blocks are left and they
+    # are checked once per author instead of once per post
+    authors = Relation.objects.followings(viewer).filter(~Relation.objects.blocked_filter(viewer, 'target'))
+    # likes are denormalized on posts, comments are counted per candidate with the (post, -created, id) index
+    comments = Comment.objects.filter(post=OuterRef('pk')).order_by().values('post').annotate(count=Count('id'))
+    posts = Post.objects.filter(
+        author__in=authors.values('target'), created__gte=now - timedelta(hours=window_hours),
+    ).annotate(
+        comment_count=Coalesce(Subquery(comments.values('count')), 0),
+        # in hours, computed by the database: parsing thousands of timestamps costs more than the scoring itself
+        age=Extract(ExpressionWrapper(Value(now) - F('created'), output_field=DurationField()), 'epoch',
+                    output_field=FloatField()) / 3600,
+    ).order_by('-created')[:limit]
+    rows = list(posts.values_list('id', 'author_id', 'age', 'like_count', 'comment_count'))
+    if not rows:
+        return Candidates(np.empty(0, dtype=np.int64), np.empty((0, len(FEATURES))))
+
+    ids, authors, ages, likes, comments = zip(*rows)
+    ids, authors = np.array(ids, dtype=np.int64), np.array(authors, dtype=np.int64)
+
+    affinity = dict(Post.objects.filter(
+        author__in=set(authors.tolist()), likes__user=viewer, likes__is_liked=True
+    ).order_by().values('author').annotate(count=Count('id')).values_list('author', 'count'))
+
+    features = np.empty((len(ids), len(FEATURES)))
+    features[:, 0] = ages
+    features[:, 1] = likes
+    features[:, 2] = comments
+    features[:, 3] = [affinity.get(author, 0) for author in authors.tolist()]
+    return Candidates(ids, features)
+
+
+def score(features, weights=None):
+    """
+    Score every row of a (post, feature) matrix at once.
+
+    Engagement adds up as weighted logarithms, so a few likes matter more than the thousandth one, and the sum
+    halves every `age` weight hours.
+    """
+    weights = weights or settings.FEED_RANKING_WEIGHTS
+    age, engagement = features[:, 0], np.log1p(features[:, 1:])
+    vector = np.array([weights[name] for name in FEATURES[1:]])
+    return (1 + engagement @ vector) * np.exp2(-age / weights['age'])
+
+
+def rank(viewer, limit=None, size=None, weights=None):
+    """
+    Return the ids of the `size` best scored candidate posts for `viewer`, best first.
+    """
+    size = size or settings.FEED_RANKING_SIZE
+    candidates = load_candidates(viewer, limit)
+    if not len(candidates):
+        return []
+
+    scores = score(candidates.features, weights)
+    # only the returned posts are sorted, the others are just partitioned away
+    top = np.argpartition(-scores, size - 1)[:size] if len(scores) > size else np.arange(len(scores))
+    top = top[np.lexsort((-candidates.ids[top], -scores[top]))]
+    return candidates.ids[top].tolist()
@@ -4,15 +4,20 @@ from generic_relations.relations import GenericRelatedField
 from .models import *
 
 
-class PinSerializer:
-    is_pinned = serializers.SerializerMethodField(method_name='is_pinned')
+class PinSerializer(serializers.Serializer):
+    pinned_model = None
+    is_pinned = serializers.SerializerMethodField()
 
-    def is_pinned(self, obj):
-        return PinnedPost.objects.filter(post=obj).exists()
+    def get_is_pinned(self, obj):
+        # list querysets annotate the pin state via `ModelPinManager.with_pin_state`
+        if hasattr(obj, 'is_pinned'):
+            return obj.is_pinned
 
+        return self.pinned_model.objects.is_pinned(obj)
 
-class PostSerializer(serializers.ModelSerializer):
-    is_pinned = serializers.SerializerMethodField()
+
+class PostSerializer(PinSerializer, serializers.ModelSerializer):
+    pinned_model = PinnedPost
 
     class Meta:
         model = Post
@@ -20,25 +25,21 @@ class PostSerializer(serializers.ModelSerializer):
             'id',
             'content',
             'image',
+            'image_variants',
             'file',
             'is_pinned',
+            'like_count',
         ]
-        read_only_field = ['is_pinned', ]
+        read_only_fields = ['image_variants', 'is_pinned', 'like_count', ]
 
-    def get_is_pinned(self, obj):
-        return PinnedPost.objects.filter(post=obj).exists()
 
-
-class DetailPostSerializer(serializers.ModelSerializer):
-    is_pinned = serializers.SerializerMethodField()
+class DetailPostSerializer(PinSerializer, serializers.ModelSerializer):
+    pinned_model = PinnedPost
 
     class Meta:
         model = Post
-        fields = "__all__"
-        read_only_fields = ["author", "likes", "is_pinned"]
-
-    def get_is_pinned(self, obj):
-        return PinnedPost.objects.filter(post=obj).exists()
+        exclude = ["search_vector", "hashtags", "mentions", "version", "modified"]
+        read_only_fields = ["author", "likes", "image_variants", "is_pinned", "like_count"]
 
 
 class CommentSerializer(serializers.ModelSerializer):
@@ -47,35 +48,37 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ['content']
 
 
-class ListCommentSerializer(serializers.ModelSerializer):
+class ListCommentSerializer(PinSerializer, serializers.ModelSerializer):
+    pinned_model = PinnedComment
     has_reply = serializers.SerializerMethodField()
-    is_pinned = serializers.SerializerMethodField(method_name='get_is_pinned')
 
     class Meta:
         model = Comment
-        fields = ['id', 'author', 'post', 'content', 'created', 'is_pinned', 'has_reply', 'parent']
+        fields = ['id', 'author', 'post', 'content', 'created', 'is_pinned', 'has_reply', 'parent', 'like_count']
+        read_only_fields = ['like_count', ]
 
     def get_has_reply(self, obj):
-        return obj.replies.exists()
-
-    def get_is_pinned(self, obj):
-        return PinnedComment.objects.filter(comment=obj).exists()
+        return obj.reply_count > 0
 
 
-class DetailCommentSerializer(serializers.ModelSerializer):
+class DetailCommentSerializer(PinSerializer, serializers.ModelSerializer):
+    pinned_model = PinnedComment
     has_reply = serializers.SerializerMethodField()
-    is_pinned = serializers.SerializerMethodField()
 
     class Meta:
         model = Comment
-        fields = ['author', 'post', 'content', 'created', 'is_pinned', 'parent', 'has_reply']
-        read_only_fields = ['author', 'post', 'created', 'is_pinned', 'parent', ]
+        fields = ['author', 'post', 'content', 'created', 'is_pinned', 'parent', 'has_reply', 'like_count']
+        read_only_fields = ['author', 'post', 'created', 'is_pinned', 'parent', 'like_count', ]
 
     def get_has_reply(self, obj):
-        return obj.replies.exists()
+        return obj.reply_count > 0
 
-    def get_is_pinned(self, obj):
-        return PinnedComment.objects.filter(comment=obj).exists()
+
+class ThreadCommentSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Comment
+        fields = ['id', 'author', 'parent', 'content', 'created', 'depth', 'reply_count', 'like_count']
+        read_only_fields = fields
 
 
 class LikeSerializer(serializers.ModelSerializer):
@@ -90,3 +93,48 @@ class LikeSerializer(serializers.ModelSerializer):
         model = Like
         fields = ["user", "liked_object", "created", ]
         read_only_fields = fields
+
+
+class SearchPostSerializer(serializers.ModelSerializer):
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Post
+        fields = ['id', 'author', 'content', 'image', 'created', 'like_count', 'rank']
+        read_only_fields = fields
+
+
+class SearchCommentSerializer(serializers.ModelSerializer):
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Comment
+        fields = ['id', 'author', 'post', 'parent', 'content', 'created', 'like_count', 'rank']
+        read_only_fields = fields
+
+
+class ListLikeSerializer(serializers.ModelSerializer):
+    # same representation as `LikeSerializer` without loading every liked object, used by the async likes list
+    liked_object = serializers.IntegerField(source='object_id', read_only=True)
+
+    class Meta:
+        model = Like
+        fields = ["user", "liked_object", "created", ]
+        read_only_fields = fields
+
+
+class ViewerStateSerializer(serializers.Serializer):
+    MAX_IDS = 100
+
+    posts = serializers.ListField(child=serializers.IntegerField(min_value=1), max_length=MAX_IDS, default=list)
+    comments = serializers.ListField(child=serializers.IntegerField(min_value=1), max_length=MAX_IDS, default=list)
+    users = serializers.ListField(child=serializers.IntegerField(min_value=1), max_length=MAX_IDS, default=list)
+
+
+class TrendingHashtagSerializer(serializers.ModelSerializer):
+    name = serializers.CharField(source='hashtag.name')
+
+    class Meta:
+        model = TrendingHashtag
+        fields = ['position', 'name', 'count', 'refreshed']
+        read_only_fields = fields
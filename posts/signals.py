@@ -0,0 +1,56 @@
+from functools import partial
+
+from django.db import transaction
+from django.dispatch import receiver
+from django.db.models.signals import post_save, post_delete
+
+from profiles.models import Profile, Relation
+from .cache import invalidate_listing
+from .models import FeedItem, Post, Comment, Hashtag
+
+
+@receiver(signal=post_save, sender=Relation)
+def sync_feed_with_relation(sender, instance, **kwargs):
+    if instance.is_active and instance.state == Relation.RelationChoices.FOLLOWS:
+        FeedItem.objects.backfill(owner=instance.actor_id, author=instance.target_id)
+    else:
+        FeedItem.objects.prune(owner=instance.actor_id, author=instance.target_id)
+
+
+@receiver(signal=post_save, sender=Post)
+@receiver(signal=post_save, sender=Comment)
+def tag_content(sender, instance, created, update_fields, raw, **kwargs):
+    # whatever writes the content, views, the admin or the shell, its hashtags and mentions follow
+    if not raw and (created or instance.content_changed(update_fields)):
+        Hashtag.objects.tag(instance, created=created)
+
+
+@receiver(signal=post_delete, sender=Comment)
+def detach_deleted_comment(sender, instance, **kwargs):
+    Comment.objects.detach_from_thread(instance)
+
+
+@receiver(signal=post_save, sender=Post)
+@receiver(signal=post_delete, sender=Post)
+def invalidate_post_listing(sender, instance, **kwargs):
+    if instance.author_id is not None:
+        transaction.on_commit(partial(invalidate_listing, instance.author_id))
+
+
+@receiver(signal=post_save, sender=Profile)
+def invalidate_profile_listing(sender, instance, created, **kwargs):
+    # e.g. `private` flipped
+    if not created:
+        transaction.on_commit(partial(invalidate_listing, instance.user_id))
+
+
+@receiver(signal=post_save, sender=Post)
+def count_created_post(sender, instance, created, **kwargs):
+    if created and instance.author_id is not None:
+        Profile.objects.adjust_post_count(instance.author_id, 1)
+
+
+@receiver(signal=post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    if instance.author_id is not None:
+        Profile.objects.adjust_post_count(instance.author_id, -1)
@@ -0,0 +1,33 @@
+import re
+
+from django.db.models.functions import Lower
+
+# a tag or mention starts a word: "a#b" and "me@example.com" are neither
+HASHTAG_PATTERN = re.compile(r'(?<![\w#])#(\w{1,100})')
+MENTION_PATTERN = re.compile(r'(?<![\w@])@(\w{1,100})')
+
+
+def normalize(name):
+    # same folding as the database Lower(), so names compare equal on both sides
+    return name.lower()
+
+
+def extract_hashtags(text):
+    """
+    Distinct normalized hashtags of `text`, in order of appearance.
+    """
+    return list(dict.fromkeys(normalize(name) for name in HASHTAG_PATTERN.findall(text or '')))
+
+
+def extract_mentions(text):
+    return list(dict.fromkeys(normalize(name) for name in MENTION_PATTERN.findall(text or '')))
+
+
+def mentioned_users(user_model, text):
+    # usernames are matched case-insensitively, backed by the index on Lower("username")
+    names = extract_mentions(text)
+    if not names:
+        return user_model.objects.none()
+    return user_model.objects.annotate(username_lower=Lower('username')).filter(
+        username_lower__in=names, is_active=True
+    )
@@ -1,22 +1,41 @@
 from django.urls import path
 
 from .views import *
+from .async_views import AsyncListPostAPIView, AsyncCommentAPIView, AsyncReplyAPIView, AsyncLikeAPIView
 from .models import Post, Comment
 
 urlpatterns = [
     path('posts/', ListCreatePostAPIView.as_view()),
     path('posts/<int:id>/', DetailPostAPIView.as_view()),
     path('profiles/<int:id>/posts/', ListPostAPIView.as_view()),
+    path('feed/', HomeTimelineAPIView.as_view()),
+    path('feed/ranked/', RankedTimelineAPIView.as_view()),
 
     path('posts/<int:id>/comments/', CommentAPIView.as_view()),
     path('comments/<int:id>/', DetailCommentAPIView.as_view()),
 
     path('comments/<int:id>/replies/', ReplyAPIView.as_view()),
+    path('posts/<int:id>/thread/', CommentThreadAPIView.as_view()),
+    path('comments/<int:id>/thread/', CommentSubtreeAPIView.as_view()),
     path('replies/<int:id>/', DetailCommentAPIView.as_view()),
 
     path('posts/<int:id>/likes/', LikeAPIView.as_view(), {'target_type': Post}),
     path('comments/<int:id>/likes/', LikeAPIView.as_view(), {'target_type': Comment}),
 
+    path('viewer-state/', ViewerStateAPIView.as_view()),
+
+    path('search/posts/', SearchPostAPIView.as_view()),
+    path('search/comments/', SearchCommentAPIView.as_view()),
+
+    path('hashtags/trending/', TrendingHashtagAPIView.as_view()),
+    path('hashtags/<str:name>/posts/', HashtagPostAPIView.as_view()),
+
     path('posts/<int:id>/toggle_pin/', PinPostAPIView.as_view()),
-    path('comments/<int:id>/toggle_pin/', PinCommentAPIView.as_view())
+    path('comments/<int:id>/toggle_pin/', PinCommentAPIView.as_view()),
+
+    path('async/profiles/<int:id>/posts/', AsyncListPostAPIView.as_view()),
+    path('async/posts/<int:id>/comments/', AsyncCommentAPIView.as_view()),
+    path('async/comments/<int:id>/replies/', AsyncReplyAPIView.as_view()),
+    path('async/posts/<int:id>/likes/', AsyncLikeAPIView.as_view(), {'target_type': Post}),
+    path('async/comments/<int:id>/likes/', AsyncLikeAPIView.as_view(), {'target_type': Comment}),
 ]
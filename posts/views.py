@@ -1,13 +1,26 @@
-from rest_framework.generics import RetrieveUpdateDestroyAPIView, ListAPIView, ListCreateAPIView
+from functools import partial
+
+from rest_framework.generics import (RetrieveUpdateDestroyAPIView, ListAPIView, ListCreateAPIView, GenericAPIView,
+                                     get_object_or_404)
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.status import HTTP_200_OK
 from django.conf import settings
+from django.db import transaction
 from .serializers import (PostSerializer, DetailPostSerializer, CommentSerializer, ListCommentSerializer,
-                          DetailCommentSerializer, LikeSerializer)
-from .models import Post, Comment, Like, PinnedPost, PinnedComment
+                          DetailCommentSerializer, LikeSerializer, ThreadCommentSerializer, ViewerStateSerializer,
+                          SearchPostSerializer, SearchCommentSerializer, TrendingHashtagSerializer)
+from .models import Post, Comment, Like, PinnedPost, PinnedComment, FeedItem, Hashtag, TrendingHashtag
+from profiles.cache import get_states_for
+from profiles.models import Relation
 from .permissions import IsAuthor
 from .generics import PinnedItemAPIView
+from .images import schedule_variants
+from .tags import normalize
+from .cache import listing_key, get_listing, set_listing, invalidate_listing
+from .ranking import rank
+from social_network.conditional import ConditionalRetrieveMixin
 
 
 class ListCreatePostAPIView(ListCreateAPIView):
@@ -21,14 +34,22 @@ class ListCreatePostAPIView(ListCreateAPIView):
         return Post.objects.list_with_pin_filter(PinnedPost).filter(author=self.request.user)
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        post = serializer.save(author=self.request.user)
+        FeedItem.objects.fan_out(post)
+        schedule_variants(post)
 
 
-class DetailPostAPIView(RetrieveUpdateDestroyAPIView):
+class DetailPostAPIView(ConditionalRetrieveMixin, RetrieveUpdateDestroyAPIView):
     serializer_class = DetailPostSerializer
-    queryset = Post.objects.all()
+    queryset = Post.objects.with_pin_state(PinnedPost)
     permission_classes = [IsAuthenticated, IsAuthor]
     lookup_url_kwarg = "id"
+    stamp_fields = ('author', 'version', 'modified')
+
+    def perform_update(self, serializer):
+        post = serializer.save()
+        if 'image' in serializer.validated_data:
+            schedule_variants(post)
 
 
 class ListPostAPIView(ListAPIView):
@@ -37,7 +58,39 @@ class ListPostAPIView(ListAPIView):
     lookup_url_kwarg = "id"
 
     def get_queryset(self):
-        return Post.objects.list_with_pin_filter(PinnedPost).filter(author_id=self.kwargs[self.lookup_url_kwarg])
+        return Post.objects.list_with_pin_filter(PinnedPost).filter(
+            Post.objects.visibility(self.request.user), author_id=self.kwargs[self.lookup_url_kwarg])
+
+    def list(self, request, *args, **kwargs):
+        key = listing_key(self.kwargs[self.lookup_url_kwarg], request.user.id, request.build_absolute_uri())
+        data = get_listing(key)
+        if data is not None:
+            return Response(data)
+
+        response = super().list(request, *args, **kwargs)
+        set_listing(key, response.data)
+        return response
+
+
+class HomeTimelineAPIView(ListAPIView):
+    serializer_class = PostSerializer
+    permission_classes = [IsAuthenticated, ]
+
+    def get_queryset(self):
+        return FeedItem.objects.timeline(self.request.user.id, Post.objects.visibility(self.request.user))
+
+
+class RankedTimelineAPIView(ListAPIView):
+    serializer_class = PostSerializer
+    permission_classes = [IsAuthenticated, ]
+    # a single page of the best scored posts, scores have no stable order to page through
+    pagination_class = None
+
+    def list(self, request, *args, **kwargs):
+        ids = rank(request.user)
+        posts = {post.id: post for post in Post.objects.with_pin_state(PinnedPost).filter(pk__in=ids)}
+        serializer = self.get_serializer([posts[post_id] for post_id in ids if post_id in posts], many=True)
+        return Response(serializer.data)
 
 
 class CommentAPIView(ListCreateAPIView):
@@ -45,7 +98,8 @@ class CommentAPIView(ListCreateAPIView):
     lookup_url_kwarg = "id"
 
     def get_queryset(self):
-        return Comment.objects.list_with_pin_filter(PinnedComment).filter(post_id=self.kwargs[self.lookup_url_kwarg])
+        return Comment.objects.list_with_pin_filter(PinnedComment).filter(
+            Comment.objects.visibility(self.request.user), post_id=self.kwargs[self.lookup_url_kwarg])
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -54,14 +108,16 @@ class CommentAPIView(ListCreateAPIView):
         return ListCommentSerializer
 
     def perform_create(self, serializer):
-        return serializer.save(author=self.request.user, post_id=self.kwargs[self.lookup_url_kwarg])
+        comment = serializer.save(author=self.request.user, post_id=self.kwargs[self.lookup_url_kwarg])
+        return Comment.objects.attach_to_thread(comment)
 
 
-class DetailCommentAPIView(RetrieveUpdateDestroyAPIView):
+class DetailCommentAPIView(ConditionalRetrieveMixin, RetrieveUpdateDestroyAPIView):
     serializer_class = DetailCommentSerializer
-    queryset = Comment.objects.filter()
+    queryset = Comment.objects.with_pin_state(PinnedComment)
     permission_classes = (IsAuthenticated, IsAuthor,)
     lookup_url_kwarg = "id"
+    stamp_fields = ('author', 'version', 'modified')
 
 
 class ReplyAPIView(ListCreateAPIView):
@@ -75,23 +131,98 @@ class ReplyAPIView(ListCreateAPIView):
         return ListCommentSerializer
 
     def get_queryset(self):
-        return Comment.objects.filter(parent_id=self.kwargs[self.lookup_url_kwarg])
+        return Comment.objects.list_with_pin_filter(PinnedComment).filter(
+            Comment.objects.visibility(self.request.user), parent_id=self.kwargs[self.lookup_url_kwarg])
 
     def perform_create(self, serializer):
         parent_id = self.kwargs[self.lookup_url_kwarg]
         parent = Comment.objects.get(id=parent_id)
 
-        return serializer.save(author=self.request.user, parent_id=parent_id,
-                               post=parent.post)
+        comment = serializer.save(author=self.request.user, parent=parent, post_id=parent.post_id)
+        return Comment.objects.attach_to_thread(comment)
 
 
 class DetailReplyAPIView(RetrieveUpdateDestroyAPIView):
     serializer_class = DetailCommentSerializer
-    queryset = Comment.objects.filter(parent__isnull=False)
+    queryset = Comment.objects.with_pin_state(PinnedComment).filter(parent__isnull=False)
     permission_classes = (IsAuthenticated, IsAuthor,)
     lookup_url_kwarg = "id"
 
 
+class CommentThreadAPIView(ListAPIView):
+    serializer_class = ThreadCommentSerializer
+    permission_classes = [IsAuthenticated, ]
+    lookup_url_kwarg = "id"
+    ordering = ('path',)
+
+    def get_depth(self):
+        depth = self.request.query_params.get('depth')
+        if depth is None:
+            return None
+
+        if not depth.isdigit():
+            raise ValidationError({"depth": "must be a non-negative integer"})
+
+        return int(depth)
+
+    def get_queryset(self):
+        return Comment.objects.thread(post_id=self.kwargs[self.lookup_url_kwarg], depth=self.get_depth()).filter(
+            Comment.objects.visibility(self.request.user))
+
+
+class CommentSubtreeAPIView(CommentThreadAPIView):
+
+    def get_queryset(self):
+        root = get_object_or_404(Comment, id=self.kwargs[self.lookup_url_kwarg])
+        return Comment.objects.thread(post_id=root.post_id, root=root, depth=self.get_depth()).filter(
+            Comment.objects.visibility(self.request.user))
+
+
+class SearchPostAPIView(ListAPIView):
+    serializer_class = SearchPostSerializer
+    permission_classes = [IsAuthenticated, ]
+    model = Post
+    ordering = ('-rank', '-id')
+
+    def get_queryset(self):
+        terms = self.request.query_params.get('q', '').strip()
+        if not terms:
+            raise ValidationError({"q": "this query parameter is required"})
+
+        queryset = self.model.objects.search(terms, viewer=self.request.user)
+
+        author = self.request.query_params.get('author')
+        if author is not None:
+            if not author.isdigit():
+                raise ValidationError({"author": "must be a user id"})
+            queryset = queryset.filter(author_id=author)
+
+        return queryset
+
+
+class SearchCommentAPIView(SearchPostAPIView):
+    serializer_class = SearchCommentSerializer
+    model = Comment
+
+
+class HashtagPostAPIView(ListAPIView):
+    serializer_class = PostSerializer
+    permission_classes = [IsAuthenticated, ]
+    lookup_url_kwarg = "name"
+
+    def get_queryset(self):
+        name = normalize(self.kwargs[self.lookup_url_kwarg])
+        return Hashtag.objects.tagged_posts(name).filter(Post.objects.visibility(self.request.user))
+
+
+class TrendingHashtagAPIView(ListAPIView):
+    serializer_class = TrendingHashtagSerializer
+    permission_classes = [IsAuthenticated, ]
+    # precomputed by the refresh_trending_hashtags command, never aggregated here
+    queryset = TrendingHashtag.objects.select_related('hashtag').order_by('position')
+    pagination_class = None
+
+
 class LikeAPIView(ListAPIView):
     serializer_class = LikeSerializer
     permission_classes = [IsAuthenticated, ]
@@ -99,8 +230,9 @@ class LikeAPIView(ListAPIView):
 
     def get_queryset(self):
         content_type = self.kwargs['target_type']
-        return Like.objects.filter_for_object(model=content_type, object_id=self.kwargs[self.lookup_url_kwarg]).filter(
-            is_liked=True)
+        object_id = self.kwargs[self.lookup_url_kwarg]
+        return Like.objects.filter_for_object(model=content_type, object_id=object_id).filter(
+            Like.objects.visibility(content_type, object_id, self.request.user), is_liked=True)
 
     def get_object(self):
         # implemented for DRF permission handling compatibility, due to significant manipulations of the base queryset
@@ -121,15 +253,43 @@ class LikeAPIView(ListAPIView):
         return Response({"detail": message}, status=HTTP_200_OK)
 
 
+class ViewerStateAPIView(GenericAPIView):
+    serializer_class = ViewerStateSerializer
+    permission_classes = [IsAuthenticated, ]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        posts, comments, users = (serializer.validated_data[key] for key in ('posts', 'comments', 'users'))
+
+        liked = Like.objects.liked_ids(request.user, {Post: posts, Comment: comments})
+        relations = get_states_for(request.user.id, users) if users else {}
+
+        return Response({
+            "liked_posts": liked[Post],
+            "liked_comments": liked[Comment],
+            "pinned_posts": PinnedPost.objects.pinned_ids(Post, posts) if posts else [],
+            "pinned_comments": PinnedComment.objects.pinned_ids(Comment, comments) if comments else [],
+            "following": [user for user, state in relations.items() if state == Relation.RelationChoices.FOLLOWS],
+            "requested": [user for user, state in relations.items() if state == Relation.RelationChoices.REQUESTED],
+            "blocked": [user for user, state in relations.items() if state == Relation.RelationChoices.BLOCKS],
+        }, status=HTTP_200_OK)
+
+
 class PinPostAPIView(PinnedItemAPIView):
     limit = settings.PINNED_POST_LIMIT
-    queryset = PinnedPost.objects.all()
     object_model = Post
     pinned_object_model = PinnedPost
 
+    def perform_toggle(self, object_id):
+        toggled = super().perform_toggle(object_id)
+        # the pin row is written by SQL, the post_save signal of `PinnedPost` does not run
+        if toggled is not None and toggled[1] is not None:
+            transaction.on_commit(partial(invalidate_listing, self.request.user.id))
+        return toggled
+
 
 class PinCommentAPIView(PinnedItemAPIView):
     limit = settings.PINNED_COMMENT_LIMIT
-    queryset = PinnedComment.objects.all()
     object_model = Comment
     pinned_object_model = PinnedComment
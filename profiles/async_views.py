@@ -0,0 +1,24 @@
+from django.contrib.auth import get_user_model
+from django.http import Http404, JsonResponse
+
+from social_network.async_views import AsyncAPIView
+from .cache import aget_state
+from .models import Relation
+from .serializers import UserProfileSerializer, UserPrivateProfileSerializer
+
+User = get_user_model()
+
+
+class AsyncProfileDetailAPIView(AsyncAPIView):
+    async def get(self, request, id):
+        try:
+            target = await User.objects.select_related('profile').aget(id=id)
+        except User.DoesNotExist:
+            raise Http404
+
+        serializer_class = UserProfileSerializer
+        if target != request.user and target.profile.is_private \
+                and await aget_state(request.user.id, target.id) != Relation.RelationChoices.FOLLOWS:
+            serializer_class = UserPrivateProfileSerializer
+
+        return JsonResponse(serializer_class(target, context={'request': request}).data)
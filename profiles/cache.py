@@ -0,0 +1,81 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from .models import Relation
+
+# cached in place of a missing/inactive relation so that misses are cached too
+NO_RELATION = ''
+
+
+def relation_key(actor_id, target_id):
+    return f"relation:{actor_id}:{target_id}"
+
+
+def get_cached_states(pairs):
+    """
+    Return the cached states of `pairs`, pairs that are not cached are left out.
+    """
+    keys = {relation_key(*pair): pair for pair in pairs}
+    return {keys[key]: state or None for key, state in cache.get_many(keys).items()}
+
+
+def add_states(states):
+    # `add` never overwrites a state written by a concurrent transition, see `set_state`
+    for (actor_id, target_id), state in states.items():
+        cache.add(relation_key(actor_id, target_id), state or NO_RELATION, settings.RELATION_CACHE_TIMEOUT)
+
+
+def get_states(pairs):
+    """
+    Return the active relation state of every (actor_id, target_id) pair, ``None`` where there is none.
+
+    Cached pairs are answered from the cache, the rest are loaded with a single query.
+    """
+    states = get_cached_states(pairs)
+
+    missing = [pair for pair in pairs if pair not in states]
+    if missing:
+        condition = Q()
+        for actor_id, target_id in missing:
+            condition |= Q(actor_id=actor_id, target_id=target_id)
+
+        found = {
+            (actor_id, target_id): state
+            for actor_id, target_id, state in Relation.objects.filter(condition).values_list(
+                'actor_id', 'target_id', 'state')
+        }
+        loaded = {pair: found.get(pair) for pair in missing}
+        add_states(loaded)
+        states.update(loaded)
+
+    return states
+
+
+def get_state(actor_id, target_id):
+    return get_states([(actor_id, target_id)])[(actor_id, target_id)]
+
+
+async def aget_state(actor_id, target_id):
+    # async counterpart of `get_state`, for the native async views
+    key = relation_key(actor_id, target_id)
+    state = await cache.aget(key)
+    if state is None:
+        state = await Relation.objects.filter(actor_id=actor_id, target_id=target_id).values_list(
+            'state', flat=True).afirst()
+        await cache.aadd(key, state or NO_RELATION, settings.RELATION_CACHE_TIMEOUT)
+
+    return state or None
+
+
+def get_states_for(actor_id, target_ids):
+    states = get_states([(actor_id, target_id) for target_id in target_ids])
+    return {target_id: state for (_, target_id), state in states.items()}
+
+
+def set_state(actor_id, target_id, state):
+    cache.set(relation_key(actor_id, target_id), state or NO_RELATION, settings.RELATION_CACHE_TIMEOUT)
+
+
+def invalidate(actor_id, target_id):
+    cache.delete(relation_key(actor_id, target_id))
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    if settings.CACHES["default"]["BACKEND"] not in PROCESS_LOCAL_CACHES:
+        return []
+
+    return [Warning(
+        "The default cache is local to each process.",
+        hint="Relation states and authenticated users are cached, other server processes keep serving them after "
+             "a block, an unfollow or a deactivation. Set CACHE_BACKEND and CACHE_LOCATION to Redis or Memcached.",
+        id="profiles.W001",
+    )]
@@ -0,0 +1,72 @@
+from .cache import get_cached_states, add_states
+from .models import Relation
+
+
+class RelationContext:
+    """
+    Both directions of the relation between `actor` and `target`, shared by everything handling one request.
+
+    Relation states are answered from the relation cache when both directions are cached, otherwise both
+    relation rows are loaded with a single query, and that same read is reused by the `Relation` managers.
+    """
+
+    def __init__(self, actor, target):
+        self.actor = actor
+        self.target = target
+        self._relations = None
+
+    @property
+    def pairs(self):
+        return (self.actor.id, self.target.id), (self.target.id, self.actor.id)
+
+    @property
+    def relations(self):
+        if self._relations is None:
+            self._relations = Relation.all_objects.between(self.actor, self.target)
+            add_states({pair: self._active_state(pair) for pair in self.pairs})
+        return self._relations
+
+    @property
+    def outgoing(self):
+        return self.relations.get(self.pairs[0])
+
+    @outgoing.setter
+    def outgoing(self, relation):
+        self.relations[self.pairs[0]] = relation
+
+    @property
+    def incoming(self):
+        return self.relations.get(self.pairs[1])
+
+    @incoming.setter
+    def incoming(self, relation):
+        self.relations[self.pairs[1]] = relation
+
+    @property
+    def outgoing_state(self):
+        return self._state(self.pairs[0])
+
+    @property
+    def incoming_state(self):
+        return self._state(self.pairs[1])
+
+    def _state(self, pair):
+        if self._relations is None:
+            cached = get_cached_states(self.pairs)
+            if len(cached) == len(self.pairs):
+                return cached[pair]
+
+        return self._active_state(pair)
+
+    def _active_state(self, pair):
+        relation = self.relations.get(pair)
+        return relation.state if relation is not None and relation.is_active else None
+
+
+def get_relation_context(request, target):
+    context = getattr(request, 'relation_context', None)
+
+    if context is None or context.target.id != target.id:
+        context = request.relation_context = RelationContext(request.user, target)
+
+    return context
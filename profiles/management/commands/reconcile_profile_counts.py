@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from profiles.models import Profile
+from social_network.batching import id_chunks
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized follower, following and post counts of profiles from relations and posts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        updated = 0
+        for user_ids in id_chunks(Profile.objects.all(), 'user_id', options['chunk_size']):
+            updated += Profile.objects.reconcile_counts(user_ids)
+
+        self.stdout.write(f"Profile: {updated} rows reconciled")
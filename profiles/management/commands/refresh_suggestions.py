@@ -0,0 +1,45 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+from django.utils import timezone
+
+from profiles.models import Suggestion
+from profiles.suggestions import changed_users, refresh
+
+
+class Command(BaseCommand):
+    help = "Recompute the \"people you may know\" suggestions from the follow graph, for everyone or only for " \
+           "the users whose relations changed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--incremental', action='store_true',
+                            help="only users with relations modified since the last run, or since --since")
+        parser.add_argument('--since', help="ISO 8601 timestamp, implies --incremental")
+        parser.add_argument('--users', type=int, nargs='+', help="only these user ids")
+        parser.add_argument('--limit', type=int, help="suggestions kept per user")
+        parser.add_argument('--batch-size', type=int, help="users multiplied at once")
+
+    def handle(self, *args, **options):
+        user_ids = options['users']
+
+        if options['incremental'] or options['since']:
+            since = self.parse_since(options['since']) if options['since'] else \
+                Suggestion.objects.aggregate(since=Max('computed'))['since']
+            if since is None:
+                raise CommandError("no previous run to refresh from, run a full refresh first")
+            user_ids = sorted(changed_users(since) | set(user_ids or ()))
+            self.stdout.write(f"{len(user_ids)} users with relations changed since {since.isoformat()}")
+
+        written = refresh(user_ids, options['limit'], options['batch_size'], log=self.log)
+        self.stdout.write(f"Suggestion: {written} rows written")
+
+    def parse_since(self, value):
+        try:
+            since = datetime.fromisoformat(value)
+        except ValueError:
+            raise CommandError(f"invalid --since '{value}'")
+        return since if timezone.is_aware(since) else timezone.make_aware(since)
+
+    def log(self, message):
+        self.stdout.write(message)
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-18 10:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("profiles", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="relation",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["target", "state"],
+                name="relation_active_target_idx",
+            ),
+        ),
+    ]
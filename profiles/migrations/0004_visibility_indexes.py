@@ -0,0 +1,31 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("profiles", "0003_version_stamps"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="profile",
+            index=models.Index(
+                condition=models.Q(("private", True)),
+                fields=["user"],
+                name="profile_private_user_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="relation",
+            index=models.Index(
+                condition=models.Q(("is_active", True), ("state", "BLOCKS")),
+                fields=["actor", "target"],
+                name="relation_active_block_idx",
+            ),
+        ),
+    ]
@@ -1,10 +1,51 @@
 from django.core.exceptions import PermissionDenied, ValidationError
 from django.utils.translation import gettext_lazy as _
-from django.db import models
+from django.apps import apps
+from django.db import IntegrityError, connections, models, transaction
+from django.db.models.signals import post_save
+from django.db.models.functions import Coalesce
 from django.conf import settings
-
-
-class Profile(models.Model):
+from django.utils import timezone
+
+from social_network.conditional import VersionedModel, bump_version
+
+
+class ProfileManager(models.Manager):
+
+    def adjust_follow_counts(self, actor_id, target_id, delta):
+        # rows are always updated in user id order, so concurrent transitions never deadlock on them
+        updates = sorted([
+            (actor_id, {'following_count': models.F('following_count') + delta}),
+            (target_id, {'follower_count': models.F('follower_count') + delta}),
+        ], key=lambda update: update[0])
+        for user_id, counts in updates:
+            bump_version(self.filter(user_id=user_id), **counts)
+
+    def adjust_post_count(self, user_id, delta):
+        return bump_version(self.filter(user_id=user_id), post_count=models.F('post_count') + delta)
+
+    def reconcile_counts(self, user_ids):
+        """
+        Recompute the counters of the profiles of `user_ids` from the relations and posts, return how many drifted.
+        """
+        follows = Relation.objects.filter(state=Relation.RelationChoices.FOLLOWS).order_by()
+        # posts depends on profiles, not the other way around
+        posts = apps.get_model('posts', 'Post').objects.filter(author=models.OuterRef('user')).order_by()
+        counts = {
+            'follower_count': follows.filter(target=models.OuterRef('user')).values('target'),
+            'following_count': follows.filter(actor=models.OuterRef('user')).values('actor'),
+            'post_count': posts.values('author'),
+        }
+        counts = {
+            field: Coalesce(models.Subquery(rows.annotate(count=models.Count('id')).values('count')), 0)
+            for field, rows in counts.items()
+        }
+
+        drifted = self.filter(user_id__in=user_ids).exclude(**counts)
+        return bump_version(drifted, **counts)
+
+
+class Profile(VersionedModel):
     user = models.OneToOneField(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
@@ -13,6 +54,13 @@ class Profile(models.Model):
     phone_number = models.CharField(max_length=30)
     bio = models.TextField()
     private = models.BooleanField(default=False)
+    # maintained by the relation transitions and the post signals, see `ProfileManager`
+    follower_count = models.IntegerField(default=0, editable=False)
+    following_count = models.IntegerField(default=0, editable=False)
+    post_count = models.IntegerField(default=0, editable=False)
+
+    objects = ProfileManager()
+    atomic_fields = ('follower_count', 'following_count', 'post_count')
 
     def __str__(self):
         return self.user.__str__()
@@ -24,6 +72,10 @@ class Profile(models.Model):
     class Meta:
         verbose_name = _('Profile')
         verbose_name_plural = _('Profiles')
+        indexes = [
+            # the private side of `RelationManager.visibility_filter`
+            models.Index(fields=['user'], condition=models.Q(private=True), name='profile_private_user_idx'),
+        ]
 
 
 class RelationQuerySet(models.QuerySet):
@@ -35,39 +87,101 @@ class AllRelationManager(models.Manager):
     def get_queryset(self):
         return RelationQuerySet(self.model, using=self._db)
 
-    def follow(self, actor, target):
-        relation, created = self.get_or_create(actor=actor, target=target)
-        STATE_FIELD = 'state'
-        IS_ACTIVE_FIELD = 'is_active'
-        update_fields = [STATE_FIELD]
+    def between(self, actor, target):
+        relations = self.model.all_objects.filter(
+            models.Q(actor=actor, target=target) | models.Q(actor=target, target=actor)
+        )
+        return {(relation.actor_id, relation.target_id): relation for relation in relations}
+
+    def get_context(self, actor, target, context=None):
+        if context is not None:
+            return context
+
+        from .context import RelationContext
+        return RelationContext(actor, target)
+
+    def _update(self, relation, update_fields):
+        """
+        Write `update_fields` of `relation` to the stored row of its pair and return the row's previous
+        (state, is active), in a single statement locking the row.
+        """
+        table = self.model._meta.db_table
+        relation.date_modified = timezone.now()
+        assignments = ", ".join(f"{field} = %({field})s" for field in [*update_fields, 'date_modified'])
+        sql = f"""
+            UPDATE {table} AS relation SET {assignments}
+            FROM (
+                SELECT id, state, is_active FROM {table} WHERE actor_id = %(actor)s AND target_id = %(target)s
+                FOR UPDATE
+            ) AS previous
+            WHERE relation.id = previous.id
+            RETURNING relation.id, previous.state, previous.is_active
+        """
+        params = {field: getattr(relation, field) for field in [*update_fields, 'date_modified']}
+
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(sql, {**params, 'actor': relation.actor_id, 'target': relation.target_id})
+            relation.pk, *previous = cursor.fetchone()
+
+        relation._state.adding = False
+        # `save()` is bypassed, the relation cache is kept by its receiver
+        post_save.send(sender=self.model, instance=relation, created=False, update_fields=frozenset(update_fields),
+                       raw=False, using=self.db)
+        return previous
+
+    def _save(self, relation, *update_fields):
+        with transaction.atomic(using=self.db):
+            previous = None
+            if relation.pk is None:
+                try:
+                    with transaction.atomic(using=self.db):
+                        relation.save()
+                except IntegrityError:
+                    # a concurrent first transition of the same pair inserted the row, this one updates it
+                    previous = self._update(relation, ('state', 'is_active'))
+            else:
+                previous = self._update(relation, update_fields)
+
+            was_following = previous == [self.model.RelationChoices.FOLLOWS, True]
+            is_following = relation.is_active and relation.state == self.model.RelationChoices.FOLLOWS
+            if was_following != is_following:
+                Profile.objects.adjust_follow_counts(relation.actor_id, relation.target_id, 1 if is_following else -1)
+
+        return relation
+
+    def follow(self, actor, target, context=None):
+        context = self.get_context(actor, target, context)
+        relation = context.outgoing
+        if relation is None:
+            relation = context.outgoing = self.model(actor=actor, target=target)
 
         if relation.is_active and relation.state == relation.RelationChoices.REQUESTED:
             raise PermissionDenied("a follow request has already been sent to this user")
 
-        if not created and not relation.is_active:
-            relation.is_active = True
-            update_fields.append(IS_ACTIVE_FIELD)
-
-        relation.state = relation.RelationChoices.REQUESTED if target.is_private \
+        relation.is_active = True
+        relation.state = relation.RelationChoices.REQUESTED if target.profile.is_private \
             else relation.RelationChoices.FOLLOWS
 
-        relation.save(update_fields=update_fields)
-        return relation
+        return self._save(relation, 'state', 'is_active')
+
+    def block(self, actor, target, context=None):
+        context = self.get_context(actor, target, context)
+        relation = context.outgoing
+        if relation is None:
+            relation = context.outgoing = self.model(actor=actor, target=target)
 
-    def block(self, actor, target):
-        relation, _ = self.get_or_create(actor=actor, target=target)
+        relation.is_active = True
         relation.state = relation.RelationChoices.BLOCKS
-        relation.save(update_fields=['state'])
-        self._perform_block_effects(actor=target, target=actor)
+        self._save(relation, 'state', 'is_active')
+        self._perform_block_effects(context.incoming)
         return relation
 
-    def _perform_block_effects(self, actor, target):
-        relation = self.filter(actor=actor, target=target, is_active=True).first()
-
-        if relation and relation.state != relation.RelationChoices.BLOCKS:
+    def _perform_block_effects(self, relation):
+        # the blocked user no longer follows (or requests to follow) the blocker
+        if relation and relation.is_active and relation.state != relation.RelationChoices.BLOCKS:
             relation.is_active = False
+            self._save(relation, 'is_active')
 
-        relation.save(update_fields=['is_active'])
         return relation
 
 
@@ -75,42 +189,37 @@ class RelationManager(AllRelationManager):
     def get_queryset(self):
         return RelationQuerySet(self.model, using=self._db).active()
 
-    def unfollow(self, actor, target):
-        relation = self.filter(actor=actor, target=target).first()
-        if not relation or relation.state == relation.RelationChoices.REQUESTED:
+    def unfollow(self, actor, target, context=None):
+        relation = self.get_context(actor, target, context).outgoing
+        if not relation or not relation.is_active or relation.state != relation.RelationChoices.FOLLOWS:
             raise ValidationError('you are not following this user')
 
         relation.is_active = False
-        relation.save(update_fields='is_active')
-        return relation
+        return self._save(relation, 'is_active')
 
-    def unblock(self, actor, target):
-        relation = self.filter(actor=actor, target=target).first()
+    def unblock(self, actor, target, context=None):
+        relation = self.get_context(actor, target, context).outgoing
         relation.is_active = False
-        relation.save(update_fields='is_active')
-        return relation
+        return self._save(relation, 'is_active')
 
-    def undo_request(self, actor, target):
-        relation = self.filter(actor=actor, target=target, state=self.model.RelationChoices.REQUESTED).first()
+    def undo_request(self, actor, target, context=None):
+        relation = self.get_context(actor, target, context).outgoing
 
-        if not relation:
+        if not relation or not relation.is_active or relation.state != relation.RelationChoices.REQUESTED:
             raise ValidationError('no active follow request exists.')
 
         relation.is_active = False
-        relation.save(update_fields='is_active')
-        return relation
+        return self._save(relation, 'is_active')
 
-    def accept(self, actor, target):
-        relation = self.filter(actor=target, target=actor).first()
+    def accept(self, actor, target, context=None):
+        relation = self.get_context(actor, target, context).incoming
         relation.state = relation.RelationChoices.FOLLOWS
-        relation.save(update_fields='state')
-        return relation
+        return self._save(relation, 'state')
 
-    def decline(self, actor, target):
-        relation = self.filter(actor=target, target=actor).first()
+    def decline(self, actor, target, context=None):
+        relation = self.get_context(actor, target, context).incoming
         relation.is_active = False
-        relation.save(update_fields='is_active')
-        return relation
+        return self._save(relation, 'is_active')
 
     def followers(self, profile):
         return self.filter(target=profile, state=self.model.RelationChoices.FOLLOWS)
@@ -130,6 +239,27 @@ class RelationManager(AllRelationManager):
     def is_following(self, actor, target):
         return self.filter(actor=actor, target=target, state=self.model.RelationChoices.FOLLOWS).exists()
 
+    def blocked_filter(self, viewer, user_field):
+        """
+        Condition matching rows whose `user_field` user blocks `viewer` or is blocked by them.
+        """
+        return models.Exists(self.filter(
+            models.Q(actor=models.OuterRef(user_field), target=viewer) |
+            models.Q(actor=viewer, target=models.OuterRef(user_field)),
+            state=self.model.RelationChoices.BLOCKS,
+        ))
+
+    def visibility_filter(self, viewer, user_field):
+        """
+        Condition matching rows whose `user_field` user shares content with `viewer`: no block in either
+        direction, and a public profile, one followed by `viewer` or `viewer` themselves.
+        """
+        private = models.Exists(Profile.objects.filter(user=models.OuterRef(user_field), private=True))
+        followed = models.Exists(
+            self.filter(actor=viewer, target=models.OuterRef(user_field), state=self.model.RelationChoices.FOLLOWS)
+        )
+        return ~self.blocked_filter(viewer, user_field) & (~private | models.Q(**{user_field: viewer}) | followed)
+
 
 class Relation(models.Model):
     class RelationChoices(models.TextChoices):
@@ -150,7 +280,38 @@ class Relation(models.Model):
         unique_together = [
             ('actor', 'target'),
         ]
+        indexes = [
+            models.Index(fields=['target', 'state'], condition=models.Q(is_active=True), name='relation_active_target_idx'),
+            # blocks made by the viewer, the other direction is served by relation_active_target_idx
+            models.Index(fields=['actor', 'target'], condition=models.Q(state='BLOCKS', is_active=True),
+                         name='relation_active_block_idx'),
+        ]
         default_manager_name = 'objects'
 
         verbose_name = _('relation')
         verbose_name_plural = _('relations')
+
+
+class Suggestion(models.Model):
+    """
+    A precomputed "people you may know" entry, see `profiles.suggestions`.
+    """
+    # served by suggestion_user_rank_unique
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='suggestions',
+                             db_index=False)
+    suggested = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    # users followed by `user` who follow `suggested`
+    mutual_count = models.PositiveIntegerField()
+    rank = models.PositiveSmallIntegerField()
+    computed = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'rank'], name='suggestion_user_rank_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['computed'], name='suggestion_computed_idx'),
+        ]
+
+        verbose_name = _('suggestion')
+        verbose_name_plural = _('suggestions')
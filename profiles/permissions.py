@@ -1,5 +1,6 @@
 from rest_framework.permissions import BasePermission, SAFE_METHODS
 
+from .context import get_relation_context
 from .models import Relation
 
 
@@ -21,34 +22,40 @@ class IsOwner(BasePermission):
 
 class NotIdentical(BasePermission):
     def has_permission(self, request, view):
-        return request.user.id != view.kwargs.get(view.lookup_url_kwarg)
+        lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+        return str(request.user.id) != str(view.kwargs.get(lookup_url_kwarg))
 
 
 class NotBlocked(BasePermission):
     def has_object_permission(self, request, view, obj):
-        return not Relation.objects.filter(actor=obj, target=request.user,  # obj.user
-                                           state=Relation.RelationChoices.BLOCKS).exists()
+        # obj.user
+        return get_relation_context(request, obj).incoming_state != Relation.RelationChoices.BLOCKS
 
 
 class StateNotAlreadySet(BasePermission):
 
     def has_object_permission(self, request, view, obj):
-        new_state = map_state(request.action)
-        return not Relation.objects.filter(actor=request.user, target=obj, state=new_state).exists()  # obj.user
+        new_state = map_state(view.action)
+        return get_relation_context(request, obj).outgoing_state != new_state  # obj.user
 
 
 class NotAlreadyBLocked(BasePermission):
     def has_object_permission(self, request, view, obj):
-        return not Relation.objects.filter(actor=request.user, target=obj,  # obj.user
-                                           state=Relation.RelationChoices.BLOCKS).exists()
+        # obj.user
+        return get_relation_context(request, obj).outgoing_state != Relation.RelationChoices.BLOCKS
 
 
 class IsRequested(BasePermission):
     def has_object_permission(self, request, view, obj):
-        return Relation.objects.filter(actor=obj, target=request.user,  # obj.user
-                                       state=Relation.RelationChoices.REQUESTED).exists()
+        # obj.user
+        return get_relation_context(request, obj).incoming_state == Relation.RelationChoices.REQUESTED
 
 
-AlreadyBlocked = ~ NotAlreadyBLocked
+class AlreadyBlocked(BasePermission):
+    # `~NotAlreadyBLocked` would also negate the default `has_permission` and deny every request
+    def has_object_permission(self, request, view, obj):
+        # obj.user
+        return get_relation_context(request, obj).outgoing_state == Relation.RelationChoices.BLOCKS
+
 
 IsIdentical = ~ NotIdentical
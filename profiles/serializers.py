@@ -1,7 +1,7 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
 
-from .models import Profile
+from .models import Profile, Suggestion
 
 User = get_user_model()
 
@@ -25,10 +25,22 @@ class UserPrivateProfileSerializer(serializers.ModelSerializer):
 
 class UserProfileSerializer(serializers.ModelSerializer):
     profile = ProfileSerializer(read_only=True)
+    follower_count = serializers.IntegerField(source='profile.follower_count', read_only=True)
+    following_count = serializers.IntegerField(source='profile.following_count', read_only=True)
+    post_count = serializers.IntegerField(source='profile.post_count', read_only=True)
 
     class Meta:
         model = User
         fields = [
             'email',
             'profile',
+            'follower_count',
+            'following_count',
+            'post_count',
         ]
+
+
+class SuggestionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Suggestion
+        fields = ['rank', 'suggested', 'mutual_count', 'computed']
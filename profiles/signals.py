@@ -1,8 +1,13 @@
+from functools import partial
+
+from django.db import transaction
 from django.dispatch import receiver
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.contrib.auth import get_user_model
 
-from .models import Profile
+from social_network.conditional import bump_version
+from . import cache
+from .models import Profile, Relation
 
 User = get_user_model()
 
@@ -11,3 +16,17 @@ User = get_user_model()
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
         Profile.objects.create(user=instance)
+    else:
+        # the user's fields are part of the profile representation
+        bump_version(Profile.objects.filter(user=instance))
+
+
+@receiver(signal=post_save, sender=Relation)
+def cache_relation_state(sender, instance, **kwargs):
+    state = instance.state if instance.is_active else None
+    transaction.on_commit(partial(cache.set_state, instance.actor_id, instance.target_id, state))
+
+
+@receiver(signal=post_delete, sender=Relation)
+def invalidate_relation_state(sender, instance, **kwargs):
+    transaction.on_commit(partial(cache.invalidate, instance.actor_id, instance.target_id))
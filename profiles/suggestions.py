@@ -0,0 +1,165 @@
+from itertools import islice
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from psycopg import sql
+from scipy import sparse
+
+from social_network.batching import copy_rows
+from .models import Relation, Suggestion
+
+# rows read per round trip while streaming the edges
+EDGE_CHUNK_SIZE = 100000
+
+
+def load_edges(queryset):
+    """
+    Stream the (actor, target) pairs of `queryset` into two id arrays.
+    """
+    rows = queryset.order_by().values_list('actor_id', 'target_id').iterator(chunk_size=EDGE_CHUNK_SIZE)
+    chunks = []
+    while chunk := list(islice(rows, EDGE_CHUNK_SIZE)):
+        chunks.append(np.array(chunk, dtype=np.int64).reshape(-1, 2))
+
+    edges = np.concatenate(chunks) if chunks else np.empty((0, 2), dtype=np.int64)
+    return edges[:, 0], edges[:, 1]
+
+
+def to_matrix(actors, targets, size):
+    """
+    The adjacency matrix of the edges, indexed by user id: row `actor` has a 1 in column `target`.
+    """
+    matrix = sparse.csr_matrix(
+        (np.ones(len(actors), dtype=np.int32), (actors, targets)), shape=(size, size), dtype=np.int32
+    )
+    # a pair stored twice would otherwise count twice
+    matrix.data[:] = 1
+    return matrix
+
+
+class SuggestionGraph:
+    """
+    The follow graph of the users being refreshed and everything two hops away from them.
+
+    `follows` holds the active FOLLOWS edges, `excluded` every pair that must not be suggested: existing follows,
+    pending requests, and blocks in both directions.
+    """
+
+    def __init__(self, user_ids=None):
+        follows = Relation.objects.filter(state=Relation.RelationChoices.FOLLOWS)
+        others = Relation.objects.filter(
+            state__in=[Relation.RelationChoices.REQUESTED, Relation.RelationChoices.BLOCKS]
+        )
+        blocks = Relation.objects.filter(state=Relation.RelationChoices.BLOCKS)
+
+        if user_ids is None:
+            first_hop = follows
+        else:
+            # only the rows of `user_ids` are multiplied, so only their followings' edges are needed
+            first_hop = follows.filter(actor__in=user_ids)
+            followings = first_hop.values('target')
+            follows = follows.filter(Q(actor__in=user_ids) | Q(actor__in=followings))
+            others = others.filter(actor__in=user_ids)
+            blocks = blocks.filter(target__in=user_ids)
+
+        edges = [load_edges(follows), load_edges(others), load_edges(blocks)]
+        self.size = 1 + max((int(ids.max()) for pair in edges for ids in pair if len(ids)), default=0)
+
+        (follow_actors, follow_targets), (other_actors, other_targets), (block_actors, block_targets) = edges
+        self.follows = to_matrix(follow_actors, follow_targets, self.size)
+        # blocks are excluded both ways, the blocked side is stored transposed
+        self.excluded = to_matrix(
+            np.concatenate([follow_actors, other_actors, block_targets]),
+            np.concatenate([follow_targets, other_targets, block_actors]),
+            self.size,
+        )
+        self.edge_count = len(follow_actors)
+
+    def users(self):
+        # everyone following someone has two-hop candidates
+        return np.flatnonzero(np.diff(self.follows.indptr))
+
+    def suggest(self, user_ids, limit):
+        """
+        Return the top `limit` candidates of each of `user_ids` as (user, candidate, mutual count, rank) arrays.
+
+        The count is the number of users followed by `user` who follow the candidate.
+        """
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        candidates = self.follows[user_ids] @ self.follows
+        # ascending ids within each row, kept as the tie breaker by the stable sort below
+        candidates.sort_indices()
+        candidates = candidates.tocoo()
+
+        rows = candidates.row.astype(np.int64)
+        users = user_ids[rows]
+        keep = (users != candidates.col) & (self.excluded[users, candidates.col].A1 == 0)
+        rows, users, columns, counts = rows[keep], users[keep], candidates.col[keep], candidates.data[keep]
+        if not len(rows):
+            return users, columns, counts, rows
+
+        # by row then most mutual connections first, packed in one key: a single sort instead of a lexsort
+        bound = np.int64(counts.max()) + 1
+        order = np.argsort(rows * bound + (bound - 1 - counts), kind='stable')
+        users, columns, counts = users[order], columns[order], counts[order]
+
+        # position of each candidate within its user's run
+        starts = np.flatnonzero(np.r_[True, users[1:] != users[:-1]])
+        ranks = np.arange(len(users)) - np.repeat(starts, np.diff(np.r_[starts, len(users)]))
+
+        top = ranks < limit
+        return users[top], columns[top], counts[top], ranks[top] + 1
+
+
+def write_suggestions(user_ids, users, candidates, counts, ranks, computed):
+    """
+    Replace the suggestions of `user_ids` with the given rows, in one transaction.
+    """
+    table = sql.Identifier(Suggestion._meta.db_table)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(sql.SQL("DELETE FROM {} WHERE user_id = ANY(%s)").format(table), [list(map(int, user_ids))])
+        rows = zip(users.tolist(), candidates.tolist(), counts.tolist(), ranks.tolist())
+        copy_rows(cursor, Suggestion, ('user_id', 'suggested_id', 'mutual_count', 'rank', 'computed'),
+                  ((*row, computed) for row in rows))
+
+
+def refresh(user_ids=None, limit=None, batch_size=None, log=None):
+    """
+    Recompute the suggestions of `user_ids`, or of everyone when it is ``None``.
+
+    A full refresh also drops the suggestions of users left without any candidate.
+    """
+    limit = limit or settings.SUGGESTION_LIMIT
+    batch_size = batch_size or settings.SUGGESTION_BATCH_SIZE
+    computed = timezone.now()
+
+    graph = SuggestionGraph(user_ids)
+    if log:
+        log(f"{graph.edge_count} follow edges loaded")
+
+    targets = graph.users() if user_ids is None else np.asarray(sorted(user_ids), dtype=np.int64)
+    written = 0
+    for start in range(0, len(targets), batch_size):
+        batch = targets[start:start + batch_size]
+        # ids missing from the matrix have no edges at all, they only get their old rows cleared
+        rows = graph.suggest(batch[batch < graph.size], limit)
+        write_suggestions(batch, *rows, computed)
+        written += len(rows[0])
+        if log:
+            log(f"{start + len(batch)}/{len(targets)} users, {written} suggestions")
+
+    if user_ids is None:
+        Suggestion.objects.filter(computed__lt=computed).delete()
+
+    return written
+
+
+def changed_users(since):
+    """
+    Users whose relations changed after `since`, on either side.
+    """
+    changed = Relation.all_objects.filter(date_modified__gt=since)
+    return set(changed.values_list('actor_id', flat=True)) | set(changed.values_list('target_id', flat=True))
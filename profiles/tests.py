@@ -1,3 +1,227 @@
-from django.test import TestCase
+from io import StringIO
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from social_network.testing import run_concurrently
+from .cache import get_cached_states, get_states_for
+from .models import Profile, Relation, Suggestion
+
+User = get_user_model()
+
+
+class RelationTestMixin:
+    def setUp(self):
+        self.actor = User.objects.create_user(email="actor@example.com", password="password", username="actor")
+        self.target = User.objects.create_user(email="target@example.com", password="password", username="target")
+
+    def assertCounts(self, following, followers):
+        self.assertEqual(Profile.objects.get(user=self.actor).following_count, following)
+        self.assertEqual(Profile.objects.get(user=self.target).follower_count, followers)
+
+
+class RelationTransitionTests(RelationTestMixin, TestCase):
+    def relation_reads(self, transition):
+        with CaptureQueriesContext(connection) as queries:
+            transition()
+        return [query for query in queries if query['sql'].startswith('SELECT') and 'profiles_relation' in query['sql']]
+
+    def test_transitions_read_the_relation_once(self):
+        Relation.objects.follow(self.actor, self.target)
+        Relation.objects.unfollow(self.actor, self.target)
+        Relation.objects.follow(self.target, self.actor)
+
+        self.assertEqual(len(self.relation_reads(lambda: Relation.objects.follow(self.actor, self.target))), 1)
+        self.assertCounts(1, 1)
+        self.assertEqual(len(self.relation_reads(lambda: Relation.objects.block(self.actor, self.target))), 1)
+        self.assertCounts(0, 0)
+        # the block ended the target's follow
+        self.assertFalse(Relation.objects.is_following(self.target, self.actor))
+        self.assertEqual(Profile.objects.get(user=self.actor).follower_count, 0)
+
+
+class RelationCacheTests(RelationTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.pairs = [(self.actor.id, self.target.id), (self.target.id, self.actor.id)]
+
+    def stored_states(self):
+        relations = Relation.objects.filter(actor__in=[self.actor, self.target], target__in=[self.actor, self.target])
+        stored = dict(((relation.actor_id, relation.target_id), relation.state) for relation in relations)
+        return {pair: stored.get(pair) for pair in self.pairs}
+
+    def assertCacheMatches(self):
+        stored, cached = self.stored_states(), get_cached_states(self.pairs)
+        self.assertEqual(cached, {pair: stored[pair] for pair in cached})
+        for (actor_id, target_id), state in self.stored_states().items():
+            self.assertEqual(get_states_for(actor_id, [target_id]), {target_id: state})
+
+    def test_transitions_update_the_cache_on_commit(self):
+        # cached as missing first
+        get_states_for(self.actor.id, [self.target.id])
+        get_states_for(self.target.id, [self.actor.id])
+
+        transitions = [
+            lambda: Relation.objects.follow(self.actor, self.target),
+            lambda: Relation.objects.follow(self.target, self.actor),
+            lambda: Relation.objects.unfollow(self.actor, self.target),
+            lambda: Relation.objects.block(self.actor, self.target),
+        ]
+        for transition in transitions:
+            with self.captureOnCommitCallbacks(execute=True):
+                transition()
+            # written through, not just dropped
+            self.assertEqual(len(get_cached_states(self.pairs)), 2)
+            self.assertCacheMatches()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Relation.all_objects.filter(actor=self.actor).delete()
+        self.assertEqual(list(get_cached_states(self.pairs)), [self.pairs[1]])
+        self.assertCacheMatches()
+
+    def test_rolled_back_transitions_leave_the_cache_alone(self):
+        get_states_for(self.actor.id, [self.target.id])
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                Relation.objects.follow(self.actor, self.target)
+                raise RuntimeError
+
+        self.assertEqual(callbacks, [])
+        self.assertEqual(get_cached_states(self.pairs[:1]), {self.pairs[0]: None})
+        self.assertCacheMatches()
+
+
+class ReconcileProfileCountsTests(RelationTestMixin, TestCase):
+    def test_drifted_counts_are_corrected(self):
+        Relation.objects.follow(self.actor, self.target)
+        # posts depends on profiles, not the other way around
+        apps.get_model('posts', 'Post').objects.create(author=self.target, content="post")
+        Profile.objects.filter(user=self.actor).update(following_count=5, post_count=2)
+        Profile.objects.filter(user=self.target).update(follower_count=0)
+
+        out = StringIO()
+        call_command('reconcile_profile_counts', chunk_size=1, stdout=out)
+
+        self.assertEqual(out.getvalue(), "Profile: 2 rows reconciled\n")
+        counts = Profile.objects.order_by('user_id').values_list('follower_count', 'following_count', 'post_count')
+        self.assertEqual(list(counts), [(0, 1, 0), (1, 0, 1)])
+
+
+class ProfileDetailTests(RelationTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def fields(self, viewer, user):
+        client = APIClient()
+        client.force_authenticate(viewer)
+        return set(client.get(f'/profile/{user.id}/').json())
+
+    def test_private_profiles_are_restricted_to_non_followers(self):
+        Profile.objects.filter(user=self.target).update(private=True)
+
+        self.assertNotIn('follower_count', self.fields(self.actor, self.target))
+        self.assertIn('follower_count', self.fields(self.target, self.target))
+
+        Relation.objects.follow(self.actor, self.target)
+        Relation.objects.accept(self.target, self.actor)
+        cache.clear()
+        self.assertIn('follower_count', self.fields(self.actor, self.target))
+
+    def test_public_profiles_are_not_restricted_to_private_viewers(self):
+        Profile.objects.filter(user=self.actor).update(private=True)
+
+        self.assertIn('follower_count', self.fields(self.actor, self.target))
+
+
+class VersionedSaveTests(RelationTestMixin, TestCase):
+    def test_saves_move_the_version_forward_in_their_own_update(self):
+        profile = Profile.objects.get(user=self.actor)
+        profile.bio = "bio"
+
+        with CaptureQueriesContext(connection) as queries:
+            profile.save()
+        self.assertEqual(len(queries), 1)
+        # read back from the row on access
+        self.assertEqual(profile.version, 2)
+
+        Profile.objects.get(user=self.actor).save()
+        self.assertEqual(Profile.objects.get(user=self.actor).version, 3)
+
+
+class ConcurrentRelationTests(RelationTestMixin, TransactionTestCase):
+    threads = 12
+
+    def test_concurrent_first_follows_of_a_pair_create_one_relation(self):
+        errors = run_concurrently(lambda _: Relation.objects.follow(self.actor, self.target), range(self.threads))
+
+        self.assertEqual(errors, [])
+        relation = Relation.all_objects.get(actor=self.actor, target=self.target)
+        self.assertEqual((relation.state, relation.is_active), (Relation.RelationChoices.FOLLOWS, True))
+        self.assertCounts(1, 1)
+
+    def test_concurrent_first_blocks_of_a_pair_create_one_relation(self):
+        errors = run_concurrently(lambda _: Relation.objects.block(self.actor, self.target), range(self.threads))
+
+        self.assertEqual(errors, [])
+        relation = Relation.all_objects.get(actor=self.actor, target=self.target)
+        self.assertEqual((relation.state, relation.is_active), (Relation.RelationChoices.BLOCKS, True))
+        self.assertCounts(0, 0)
+
+    def test_concurrent_follows_and_unfollows_keep_exact_counts(self):
+        Relation.objects.follow(self.actor, self.target)
+
+        def transition(number):
+            try:
+                if number % 2:
+                    Relation.objects.follow(self.actor, self.target)
+                else:
+                    Relation.objects.unfollow(self.actor, self.target)
+            except ValidationError:
+                pass
+
+        errors = run_concurrently(transition, range(self.threads))
+
+        self.assertEqual(errors, [])
+        following = int(Relation.objects.is_following(self.actor, self.target))
+        self.assertCounts(following, following)
+
+
+class RefreshSuggestionsTests(TestCase):
+    def setUp(self):
+        self.users = {
+            name: User.objects.create_user(email=f"{name}@example.com", password="password", username=name)
+            for name in ('a', 'b', 'c', 'd', 'e', 'f', 'x')
+        }
+        for actor, target in ('ab', 'ac', 'bd', 'be', 'cd', 'cf', 'cx'):
+            Relation.objects.follow(self.users[actor], self.users[target])
+        Relation.objects.block(self.users['x'], self.users['a'])
+
+    def suggestions(self):
+        return list(Suggestion.objects.order_by('user', 'rank').values_list(
+            'user__username', 'suggested__username', 'mutual_count', 'rank'))
+
+    def test_refresh_writes_ranked_two_hop_suggestions(self):
+        out = StringIO()
+        call_command('refresh_suggestions', stdout=out)
+
+        # most mutual followings first, ties by id, and never the user blocking "a"
+        self.assertEqual(self.suggestions(), [('a', 'd', 2, 1), ('a', 'e', 1, 2), ('a', 'f', 1, 3)])
+        self.assertIn("Suggestion: 3 rows written", out.getvalue())
+
+    def test_refresh_keeps_the_limit_and_replaces_previous_rows(self):
+        call_command('refresh_suggestions', stdout=StringIO())
+        Relation.objects.follow(self.users['a'], self.users['d'])
+
+        call_command('refresh_suggestions', users=[self.users['a'].id], limit=1, stdout=StringIO())
+
+        self.assertEqual(self.suggestions(), [('a', 'e', 1, 1)])
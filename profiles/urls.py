@@ -1,12 +1,15 @@
 from django.urls import path, include
 from rest_framework.routers import SimpleRouter
-from .views import ActionViewSet, ProfileAPIView, ProfileDetailAPIView
+from .views import ActionViewSet, ProfileAPIView, ProfileDetailAPIView, SuggestionAPIView
+from .async_views import AsyncProfileDetailAPIView
 
 router = SimpleRouter()
 router.register('profile', ActionViewSet)
 
 urlpatterns = [
     path('profile/me/', ProfileAPIView.as_view()),
+    path('profile/suggestions/', SuggestionAPIView.as_view()),
     path('profile/<int:id>/', ProfileDetailAPIView.as_view()),
+    path('async/profile/<int:id>/', AsyncProfileDetailAPIView.as_view()),
     path('', include(router.urls)),
 ]
@@ -6,10 +6,12 @@ from rest_framework.response import Response
 from rest_framework.viewsets import ViewSetMixin, GenericViewSet
 from rest_framework.status import HTTP_200_OK
 
-from .serializers import UserProfileSerializer, UserPrivateProfileSerializer
+from .serializers import UserProfileSerializer, UserPrivateProfileSerializer, SuggestionSerializer
 from .permissions import *
-from .models import Profile, Relation
-from rest_framework.generics import RetrieveUpdateDestroyAPIView
+from .context import get_relation_context
+from .models import Profile, Relation, Suggestion
+from rest_framework.generics import ListAPIView, RetrieveUpdateDestroyAPIView
+from social_network.conditional import ConditionalRetrieveMixin
 
 User = get_user_model()
 
@@ -45,15 +47,42 @@ class ProfileAPIView(RetrieveUpdateDestroyAPIView):
         return obj
 
 
-class ProfileDetailAPIView(RetrieveUpdateDestroyAPIView):
+class SuggestionAPIView(ListAPIView):
+    serializer_class = SuggestionSerializer
+    permission_classes = [IsAuthenticated]
+    # precomputed by the refresh_suggestions command, one read of suggestion_user_rank_unique
+    pagination_class = None
+
+    def get_queryset(self):
+        return Suggestion.objects.filter(user=self.request.user).order_by('rank')
+
+
+class ProfileDetailAPIView(ConditionalRetrieveMixin, RetrieveUpdateDestroyAPIView):
     queryset = User.objects.all()
     lookup_url_kwarg = "id"
     permission_classes = [IsAuthenticated, IsOwner]
+    stamp_fields = ('profile__private', 'profile__version', 'profile__modified')
+
+    def get_object(self):
+        # also needed by `get_serializer_class`, fetch and check it once per request
+        if not hasattr(self, '_object'):
+            self._object = super().get_object()
+        return self._object
+
+    def get_stamp_queryset(self):
+        return User.objects.select_related('profile').only(*self.stamp_fields)
+
+    def get_stamp(self, obj):
+        # the viewer decides between the two representations, so it is part of the etag
+        representation = 'restricted' if self.is_restricted(obj) else 'full'
+        return f'"profile-{obj.pk}-{obj.profile.version}-{representation}"', obj.profile.modified
+
+    def is_restricted(self, target):
+        return target != self.request.user and target.profile.is_private \
+            and get_relation_context(self.request, target).outgoing_state != Relation.RelationChoices.FOLLOWS
 
     def get_serializer_class(self):
-        user = self.request.user
-        target = self.get_object()
-        if user.profile.is_private and not Relation.objects.is_following(user, target):
+        if self.is_restricted(self.get_object()):
             return UserPrivateProfileSerializer
 
         return UserProfileSerializer
@@ -68,47 +97,47 @@ class ActionViewSet(GenericViewSet, ViewSetMixin):
             permission_classes=[IsAuthenticated, NotIdentical, NotBlocked, StateNotAlreadySet, NotAlreadyBLocked])
     def follow(self, request, *args, **kwargs):
         user = self.get_object()
-        Relation.objects.follow(request.user, user)
+        Relation.objects.follow(request.user, user, context=get_relation_context(request, user))
         return Response({"message": f"user '{user.username}' has been followed"}, status=HTTP_200_OK)
 
     @action(methods=['POST'], detail=True,
             permission_classes=[IsAuthenticated, NotIdentical, StateNotAlreadySet])
     def block(self, request, *args, **kwargs):
         user = self.get_object()
-        Relation.objects.block(request.user, user)
+        Relation.objects.block(request.user, user, context=get_relation_context(request, user))
         return Response({"message": f"user '{user.username}' has been blocked"}, status=HTTP_200_OK)
 
     @action(methods=['POST'], detail=True,
             permission_classes=[IsAuthenticated, NotIdentical, NotBlocked, NotAlreadyBLocked])
     def unfollow(self, request, *args, **kwargs):
         user = self.get_object()
-        Relation.objects.unfollow(request.user, user)
+        Relation.objects.unfollow(request.user, user, context=get_relation_context(request, user))
         return Response({"message": f"user '{user.username}' has been unfollowed"}, status=HTTP_200_OK)
 
     @action(methods=['POST'], detail=True,
             permission_classes=[IsAuthenticated, AlreadyBlocked])
     def unblock(self, request, *args, **kwargs):
         user = self.get_object()
-        Relation.objects.unblock(request.user, user)
+        Relation.objects.unblock(request.user, user, context=get_relation_context(request, user))
         return Response({"message": f"user '{user.username}' has been unblocked"}, status=HTTP_200_OK)
 
     @action(methods=['POST'], detail=True,
             permission_classes=[IsAuthenticated, NotBlocked, NotAlreadyBLocked])
     def undo_request(self, request, *args, **kwargs):
         user = self.get_object()
-        Relation.objects.undo_request(request.user, user)
+        Relation.objects.undo_request(request.user, user, context=get_relation_context(request, user))
         return Response({"message": f"follow request to user '{user.username}' has been undone"}, status=HTTP_200_OK)
 
     @action(methods=['POST'], detail=True,
             permission_classes=[IsAuthenticated, IsRequested])
     def accept(self, request, *args, **kwargs):
         user = self.get_object()
-        Relation.objects.accept(request.user, user)
+        Relation.objects.accept(request.user, user, context=get_relation_context(request, user))
         return Response({"message": f"follow request accepted"}, status=HTTP_200_OK)
 
     @action(methods=['POST'], detail=True,
             permission_classes=[IsAuthenticated, IsRequested])
     def decline(self, request, *args, **kwargs):
         user = self.get_object()
-        Relation.objects.decline(request.user, user)
+        Relation.objects.decline(request.user, user, context=get_relation_context(request, user))
         return Response({"message": f"follow request declined"}, status=HTTP_200_OK)
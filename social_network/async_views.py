@@ -0,0 +1,47 @@
+from django.http import Http404, JsonResponse
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.request import Request
+
+from accounts.authentication import AsyncJWTAuthentication
+from posts.pagination import KeysetCursorPagination
+
+
+class AsyncAPIView(View):
+    """
+    Base class of the native async read endpoints.
+
+    DRF views are sync only, so this mirrors the parts they rely on (JWT authentication, `IsAuthenticated`,
+    API exceptions and keyset pagination) on top of Django's async views and async ORM.
+    """
+    http_method_names = ['get', 'head', 'options']
+    authentication = AsyncJWTAuthentication()
+    pagination_class = KeysetCursorPagination
+    ordering = None
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            result = await self.authentication.aauthenticate(request)
+            if result is None:
+                raise exceptions.NotAuthenticated()
+
+            request.user, request.auth = result
+            return await super().dispatch(request, *args, **kwargs)
+
+        except exceptions.APIException as exc:
+            # same body as DRF's `exception_handler`
+            data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+            response = JsonResponse(data, status=exc.status_code, safe=False)
+            if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+                response['WWW-Authenticate'] = self.authentication.authenticate_header(request)
+            return response
+
+        except Http404:
+            return JsonResponse({'detail': 'Not found.'}, status=404)
+
+    async def paginated_response(self, queryset, serializer_class):
+        paginator = self.pagination_class()
+        # the paginator only needs DRF's query params and url helpers, which wrapping provides
+        page = await paginator.apaginate_queryset(queryset, Request(self.request), view=self)
+        serializer = serializer_class(page, many=True, context={'request': self.request, 'view': self})
+        return JsonResponse(paginator.get_paginated_data(serializer.data))
@@ -0,0 +1,37 @@
+from psycopg import sql
+
+
+def id_chunks(queryset, field, chunk_size):
+    """
+    Yield the values of `field` of `queryset` in ascending lists of at most `chunk_size`, each read by its own
+    keyset query.
+
+    Outside a transaction, whatever a caller writes for a chunk commits before the next one is read, so a job
+    over a whole table never holds row locks for longer than a chunk.
+    """
+    last = 0
+    while True:
+        ids = list(queryset.filter(**{f'{field}__gt': last}).order_by(field).values_list(field, flat=True)[:chunk_size])
+        if not ids:
+            return
+
+        yield ids
+        last = ids[-1]
+
+
+def copy_rows(cursor, model, columns, rows):
+    """
+    Write `rows`, tuples of values of `columns`, to the table of `model` with a single COPY, return how many.
+    """
+    statement = sql.SQL("COPY {} ({}) FROM STDIN").format(
+        sql.Identifier(model._meta.db_table),
+        sql.SQL(', ').join(map(sql.Identifier, columns)),
+    )
+    count = 0
+    # `cursor` is Django's, COPY is a psycopg extension of the DB-API cursor it wraps
+    with cursor.cursor.copy(statement) as copy:
+        for row in rows:
+            copy.write_row(row)
+            count += 1
+
+    return count
@@ -0,0 +1,74 @@
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from posts.models import Post, Comment, Like
+from profiles.models import Profile, Relation
+
+
+def user_sections(user):
+    """
+    Every kind of data `user` owns, in export order: name -> (queryset, exported fields).
+    """
+    return {
+        'profile': (
+            Profile.objects.filter(user=user),
+            ['id', 'user__email', 'user__username', 'user__first_name', 'user__last_name', 'user__date_joined',
+             'bio', 'phone_number', 'picture', 'private'],
+        ),
+        'posts': (
+            Post.objects.filter(author=user),
+            ['id', 'content', 'image', 'file', 'created', 'like_count'],
+        ),
+        'comments': (
+            Comment.objects.filter(author=user),
+            ['id', 'post_id', 'parent_id', 'content', 'created', 'like_count', 'reply_count'],
+        ),
+        'likes': (
+            Like.objects.filter(user=user, is_liked=True),
+            ['id', 'content_type__model', 'object_id', 'created'],
+        ),
+        'relations': (
+            Relation.objects.filter(actor=user),
+            ['id', 'target_id', 'state', 'date_modified'],
+        ),
+        'followers': (
+            Relation.objects.filter(target=user, state=Relation.RelationChoices.FOLLOWS),
+            ['id', 'actor_id', 'date_modified'],
+        ),
+    }
+
+
+def parse_cursor(user, cursor):
+    """
+    Return the (section, last exported id) a cursor points at, ``ValueError`` if it is not valid.
+    """
+    section, _, last_id = cursor.partition(':')
+    if section not in user_sections(user):
+        raise ValueError(f"unknown export section '{section}'")
+
+    return section, int(last_id)
+
+
+def export_user(user, cursor=None):
+    """
+    Yield everything `user` owns as NDJSON lines.
+
+    Every row is read through a server-side cursor and carries the cursor to resume the export right after it,
+    the last line is ``{"type": "end"}``.
+    """
+    sections = user_sections(user)
+    names = list(sections)
+    start, last_id = parse_cursor(user, cursor) if cursor else (names[0], 0)
+
+    for name in names[names.index(start):]:
+        queryset, fields = sections[name]
+        rows = queryset.filter(id__gt=last_id).order_by('id').values(*fields).iterator(
+            chunk_size=settings.EXPORT_CHUNK_SIZE)
+        for row in rows:
+            line = {'type': name, 'cursor': f"{name}:{row['id']}", 'data': row}
+            yield json.dumps(line, cls=DjangoJSONEncoder) + '\n'
+        last_id = 0
+
+    yield json.dumps({'type': 'end'}) + '\n'
@@ -0,0 +1,208 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework import serializers
+
+from .pool import get_pool_stats
+
+# only views of these apps are measured, admin and the metrics endpoint itself are left out
+MEASURED_APPS = ('accounts', 'posts', 'profiles')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+# state of the request being handled, also seen by the threads `sync_to_async` runs views in
+_current = ContextVar('request_metrics', default=None)
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self.lock:
+            sample = self.samples.get(labels)
+            if sample is None:
+                # one count per bucket plus +Inf, then the sum
+                sample = self.samples[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            sample[bisect_left(self.buckets, value)] += 1
+            sample[-1] += value
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            samples = [(labels, list(sample)) for labels, sample in self.samples.items()]
+
+        for labels, sample in sorted(samples):
+            label_text = ','.join(f'{key}="{escape(value)}"' for key, value in labels)
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), sample):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {sample[-1]}")
+            lines.append(f"{self.name}_count{{{label_text}}} {cumulative}")
+
+        return lines
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+REQUEST_LATENCY = Histogram('http_request_duration_seconds', "Time spent handling the request.", LATENCY_BUCKETS)
+SQL_QUERIES = Histogram('http_request_sql_queries', "SQL queries executed by the request.", QUERY_BUCKETS)
+SQL_TIME = Histogram('http_request_sql_duration_seconds', "Time spent executing SQL.", LATENCY_BUCKETS)
+SERIALIZER_TIME = Histogram('http_request_serializer_duration_seconds', "Time spent building serializer data.",
+                            LATENCY_BUCKETS)
+RESPONSE_SIZE = Histogram('http_response_size_bytes', "Size of the response body.", SIZE_BUCKETS)
+
+HISTOGRAMS = [REQUEST_LATENCY, SQL_QUERIES, SQL_TIME, SERIALIZER_TIME, RESPONSE_SIZE]
+
+POOL_GAUGES = {'pool_min', 'pool_max', 'pool_size', 'pool_available', 'requests_waiting'}
+
+
+class RequestMetrics:
+    __slots__ = ('queries', 'sql_time', 'serializer_time', 'serializing')
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.sql_time += time.perf_counter() - started
+        metrics.queries += 1
+
+
+def install_query_wrapper(sender, connection, **kwargs):
+    # connections are per thread, and the async ORM queries from other threads than the request's, so every
+    # connection gets the wrapper for good and it finds the request through the context
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def timed_data(data):
+    def wrapper(serializer):
+        metrics = _current.get()
+        # nested and list serializers go through here too, only the outermost one is timed
+        if metrics is None or metrics.serializing:
+            return data.fget(serializer)
+
+        metrics.serializing = True
+        started = time.perf_counter()
+        try:
+            return data.fget(serializer)
+        finally:
+            metrics.serializer_time += time.perf_counter() - started
+            metrics.serializing = False
+
+    return property(wrapper)
+
+
+_instrumented = False
+
+
+def instrument_serializers():
+    global _instrumented
+
+    if not _instrumented:
+        _instrumented = True
+        serializers.Serializer.data = timed_data(serializers.Serializer.data)
+        serializers.ListSerializer.data = timed_data(serializers.ListSerializer.data)
+
+
+class MetricsMiddleware:
+    """
+    Record latency, SQL query count and time, serializer time and response size of every request handled by
+    a view of `MEASURED_APPS`, labelled by URL route. Works both under WSGI and ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        instrument_serializers()
+        connection_created.connect(install_query_wrapper, dispatch_uid='metrics_query_wrapper')
+        for connection in connections.all(initialized_only=True):
+            install_query_wrapper(None, connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        metrics, token, started = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        self.record(request, response, metrics, started)
+        return response
+
+    async def __acall__(self, request):
+        metrics, token, started = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        self.record(request, response, metrics, started)
+        return response
+
+    def start(self):
+        metrics = RequestMetrics()
+        return metrics, _current.set(metrics), time.perf_counter()
+
+    def record(self, request, response, metrics, started):
+        latency = time.perf_counter() - started
+        match = request.resolver_match
+        if match is None or match.func.__module__.split('.')[0] not in MEASURED_APPS:
+            return
+
+        view = (('view', match.route),)
+        REQUEST_LATENCY.observe((*view, ('method', request.method), ('status', response.status_code)), latency)
+        SQL_QUERIES.observe(view, metrics.queries)
+        SQL_TIME.observe(view, metrics.sql_time)
+        SERIALIZER_TIME.observe(view, metrics.serializer_time)
+        if not response.streaming:
+            RESPONSE_SIZE.observe(view, len(response.content))
+
+
+def expose():
+    """
+    Render every metric in the Prometheus text exposition format.
+    """
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.expose())
+
+    pool_stats = get_pool_stats()
+    for name in sorted({name for stats in pool_stats.values() for name in stats}):
+        metric = f"db_pool_{name}"
+        lines.append(f"# TYPE {metric} {'gauge' if name in POOL_GAUGES else 'counter'}")
+        for alias, stats in pool_stats.items():
+            lines.append(f'{metric}{{alias="{alias}"}} {stats[name]}')
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,33 @@
+from django.db import connections
+
+# psycopg_pool counters, see https://www.psycopg.org/psycopg3/docs/advanced/pool.html#pool-stats
+POOL_STATS = {
+    'pool_min': "configured minimum number of connections",
+    'pool_max': "configured maximum number of connections",
+    'pool_size': "connections currently managed by the pool, in use or not",
+    'pool_available': "idle connections ready to be checked out",
+    'requests_waiting': "requests currently waiting for a connection",
+    'requests_num': "connection checkouts",
+    'requests_queued': "checkouts that had to wait because no connection was available",
+    'requests_wait_ms': "total time spent waiting for a connection",
+    'requests_errors': "checkouts that timed out or were refused, the pool was exhausted",
+    'returns_bad': "connections returned in a bad state",
+    'connections_num': "connection attempts to the server",
+    'connections_ms': "total time spent opening connections",
+    'connections_errors': "failed connection attempts",
+    'connections_lost': "connections found broken by the checkout health check",
+}
+
+
+def get_pool_stats():
+    """
+    Return the counters of every pooled database connection, by alias, since the pool was opened.
+    """
+    stats = {}
+    for alias in connections:
+        pool = connections[alias].pool if connections[alias].vendor == 'postgresql' else None
+        if pool is not None:
+            counters = pool.get_stats()
+            stats[alias] = {name: counters.get(name, 0) for name in POOL_STATS}
+
+    return stats
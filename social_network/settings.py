@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "generic_relations",
     "accounts.apps.AccountsConfig",
@@ -45,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "social_network.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -85,9 +87,40 @@ DATABASES = {
         'PASSWORD': os.environ.get('DB_PASSWORD', 'supersecure'),
         'HOST': os.environ.get('DB_HOST', 'db'),
         'PORT': os.environ.get('DB_PORT', '5432'),
+        'OPTIONS': {
+            # connections are checked out of a psycopg pool per request instead of opened per request
+            'pool': {
+                'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+                'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+                # seconds a request waits for a free connection before failing
+                'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+                # seconds before a connection is closed and replaced
+                'max_lifetime': float(os.environ.get('DB_POOL_MAX_LIFETIME', 1800)),
+                'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', 300)),
+            },
+        },
+        # with a pool, every checkout is health checked and broken connections are replaced
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+
+# permission checks and JWT authentication read relation states and users from this cache, and writes only invalidate
+# it for every server process when it is shared: use Redis or Memcached in production, e.g.
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache CACHE_LOCATION=redis://redis:6379/0
+# the local memory default is per process, for development and tests only
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache")
+
+CACHES = {
+    "default": {
+        "BACKEND": CACHE_BACKEND,
+        "LOCATION": os.environ.get("CACHE_LOCATION", ""),
     }
 }
 
+if CACHE_BACKEND == "django.core.cache.backends.locmem.LocMemCache":
+    # holds a relation state per user pair and an entry per authenticated user, the default 300 thrashes
+    CACHES["default"]["OPTIONS"] = {"MAX_ENTRIES": 100000}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -122,6 +155,10 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+MEDIA_URL = "media/"
+
+MEDIA_ROOT = BASE_DIR / "media"
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -131,8 +168,10 @@ AUTH_USER_MODEL = 'accounts.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+        'accounts.authentication.CachedJWTAuthentication',
+    ),
+    'DEFAULT_PAGINATION_CLASS': 'posts.pagination.KeysetCursorPagination',
+    'PAGE_SIZE': 20,
 }
 
 SIMPLE_JWT = {
@@ -143,3 +182,64 @@ SIMPLE_JWT = {
 PINNED_POST_LIMIT = 3
 
 PINNED_COMMENT_LIMIT = 3
+
+# home timeline: authors with more followers than FEED_FANOUT_LIMIT are merged into feeds at read time
+FEED_FANOUT_LIMIT = 10000
+
+FEED_BACKFILL_SIZE = 100
+
+FEED_BATCH_SIZE = 1000
+
+# ranked feed: the latest FEED_RANKING_CANDIDATES posts of followed authors within the window are scored and the
+# best FEED_RANKING_SIZE returned, see `posts.ranking.score`
+FEED_RANKING_CANDIDATES = 1000
+
+FEED_RANKING_WINDOW_HOURS = 72
+
+FEED_RANKING_SIZE = 50
+
+# weights of the log-scaled likes, comments and author affinity, `age` is the half-life of a score in hours
+FEED_RANKING_WEIGHTS = {
+    "age": 24,
+    "likes": 1.0,
+    "comments": 1.5,
+    "affinity": 2.0,
+}
+
+RELATION_CACHE_TIMEOUT = 300
+
+# pages of `profiles/<id>/posts/`, invalidated on post and pin writes, like counts may lag by up to this long
+POST_LIST_CACHE_TIMEOUT = 30
+
+# authentication fields of JWT users, kept short since caches of other processes are not invalidated on writes
+USER_CACHE_TIMEOUT = 60
+
+# resized variants of uploaded post images, rendered outside the request thread: name -> max width/height
+IMAGE_VARIANTS = {
+    "thumbnail": 160,
+    "feed": 720,
+    "full": 1600,
+}
+
+IMAGE_VARIANT_FORMAT = "WEBP"
+
+IMAGE_VARIANT_QUALITY = 80
+
+IMAGE_PIPELINE_WORKERS = 2
+
+# rows fetched per round trip by the server-side cursors of the data export
+EXPORT_CHUNK_SIZE = 2000
+
+# trending hashtags: uses are counted in hourly buckets, the top TRENDING_SIZE of the window are precomputed
+TRENDING_WINDOW_HOURS = 24
+
+TRENDING_SIZE = 20
+
+# "people you may know", precomputed by the refresh_suggestions command: entries kept per user, and users whose
+# two-hop candidates are multiplied at once, which bounds the memory of the job
+SUGGESTION_LIMIT = 20
+
+SUGGESTION_BATCH_SIZE = 5000
+
+# bearer token Prometheus scrapes `/metrics` with, the endpoint answers 403 when it is unset
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
@@ -0,0 +1,27 @@
+import threading
+
+from django.db import connection
+
+
+def run_concurrently(function, arguments):
+    """
+    Call `function` with each of `arguments` from its own thread and database connection, all released at once.
+    """
+    barrier = threading.Barrier(len(arguments))
+    errors = []
+
+    def worker(argument):
+        try:
+            barrier.wait()
+            function(argument)
+        except Exception as error:
+            errors.append(error)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=(argument,)) for argument in arguments]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
@@ -0,0 +1,61 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from .pool import get_pool_stats
+from .testing import run_concurrently
+
+User = get_user_model()
+
+
+class MetricsTests(TestCase):
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_require_the_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code, 403)
+
+        response = self.client.get('/metrics', headers={'Authorization': 'Bearer secret'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'db_pool_requests_num', response.content)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_metrics_are_closed_without_a_token(self):
+        self.assertEqual(self.client.get('/metrics', headers={'Authorization': 'Bearer '}).status_code, 403)
+
+
+class PoolTests(TransactionTestCase):
+    def query(self, _):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_sleep(0.05)")
+
+    def test_pool_stats_are_admin_only(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(email="user@example.com", password="password"))
+        self.assertEqual(client.get('/db/pool/').status_code, 403)
+
+        client.force_authenticate(User.objects.create_superuser(email="admin@example.com", password="password"))
+        response = client.get('/db/pool/')
+        self.assertEqual(response.status_code, 200)
+        pool = connection.settings_dict['OPTIONS']['pool']
+        self.assertEqual(response.json()['default']['pool_max'], pool['max_size'])
+
+    def test_connections_are_reused_and_checkouts_wait_for_a_free_one(self):
+        before = get_pool_stats()['default']
+        for _ in range(10):
+            self.assertEqual(run_concurrently(self.query, [None]), [])
+        sequential = get_pool_stats()['default']
+
+        # each thread returns its connection to the pool instead of closing it
+        self.assertEqual(sequential['requests_num'] - before['requests_num'], 10)
+        self.assertLessEqual(sequential['connections_num'] - before['connections_num'], 1)
+
+        started = time.perf_counter()
+        self.assertEqual(run_concurrently(self.query, range(sequential['pool_max'] + 2)), [])
+        concurrent = get_pool_stats()['default']
+
+        self.assertGreater(concurrent['requests_queued'], sequential['requests_queued'])
+        self.assertLessEqual(concurrent['pool_size'], concurrent['pool_max'])
+        self.assertLess(time.perf_counter() - started, connection.settings_dict['OPTIONS']['pool']['timeout'])
@@ -17,9 +17,14 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from .views import ExportAPIView, PoolStatsAPIView, metrics
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("", include('profiles.urls')),
     path("accounts/", include('accounts.urls')),
     path("", include('posts.urls')),
+    path("export/", ExportAPIView.as_view()),
+    path("db/pool/", PoolStatsAPIView.as_view()),
+    path("metrics", metrics),
 ]
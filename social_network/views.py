@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, StreamingHttpResponse
+from django.utils.crypto import constant_time_compare
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .export import export_user, parse_cursor
+from .metrics import expose
+from .pool import get_pool_stats
+
+
+class PoolStatsAPIView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(get_pool_stats())
+
+
+class ExportAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        cursor = request.query_params.get('cursor')
+        if cursor:
+            try:
+                parse_cursor(request.user, cursor)
+            except ValueError:
+                raise ValidationError({'cursor': "invalid export cursor"})
+
+        response = StreamingHttpResponse(export_user(request.user, cursor), content_type='application/x-ndjson')
+        response['Content-Disposition'] = f'attachment; filename="export-{request.user.id}.ndjson"'
+        return response
+
+
+def metrics(request):
+    # scraped by Prometheus, see `social_network.metrics.MetricsMiddleware`, the pool counters are as private as
+    # `PoolStatsAPIView`
+    authorization = request.headers.get('Authorization', '')
+    if not settings.METRICS_TOKEN or not constant_time_compare(authorization, f"Bearer {settings.METRICS_TOKEN}"):
+        return HttpResponseForbidden()
+
+    return HttpResponse(expose(), content_type='text/plain; version=0.0.4; charset=utf-8')